@@ -1,17 +1,60 @@
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from enum import StrEnum
+from typing import Iterator, Union
+from pathlib import Path
+import functools
+import itertools
+import json
+import os
 import random
+import sys
+import tempfile
+import threading
+import time
 import typer
-import requests # https://pypi.org/project/requests/ - to get some placeholder tarot readings from tarotapi.dev
-from art import text2art # https://pypi.org/project/art/ - to print out fancy text
+import urllib3 # https://pypi.org/project/urllib3/ - to get some placeholder tarot readings from tarotapi.dev
+try:
+    import orjson # https://pypi.org/project/orjson/ - optional, but parses the card payload several times faster
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
 
 DEFAULT_FONT="handwriting1";
 
+TAROT_API_URL = "https://tarotapi.dev/api/v1/cards"
+TAROT_CACHE_PATH = Path("~/.cache/querent/tarot.json").expanduser()
+TAROT_CACHE_TTL = 7 * 24 * 60 * 60 # seconds; the deck doesn't change much from week to week
+
+# one pool for the whole run, so any later fetches (images, card details) reuse the same connection
+_http = urllib3.PoolManager(
+    num_pools=1,
+    maxsize=2,
+    retries=urllib3.Retry(3),
+    timeout=urllib3.Timeout(connect=3.05, read=10)
+)
+_HTTP_HEADERS = {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+
+@functools.lru_cache(maxsize=512)
+def _render(text, font):
+    # the same banners and prompts ("query> " etc.) come round again and again, so only render each once
+    # (no need to pre-warm the fonts as well: `art` holds them all as in-memory dicts once it's imported,
+    # so a render is just glyph lookups and concatenation)
+    # `art` (https://pypi.org/project/art/ - to print out fancy text) builds its whole font registry on import,
+    # so it's imported here rather than up top; importing this module (or `--help`) doesn't pay for it, and
+    # the first render (the welcome banner) does
+    from art import text2art
+    return text2art(text, font=font)
+
 def fancy_print(text, font=DEFAULT_FONT):
-    print(text2art(text, font=font));
+    print(_render(text, font));
+
+def fancy_print_all(lines):
+    """fancy_print for a run of (text, font) pairs, written out in one go rather than a print apiece"""
+    print("\n".join(_render(text, font) for text, font in lines));
 
 def fancy_input(text, font=DEFAULT_FONT):
-    return input(text2art(text, font=font));
+    return input(_render(text, font));
 
 class Suit(StrEnum):
     WANDS = "wands"
@@ -47,7 +90,7 @@ class MajorArcanaName(StrEnum):
     CHARIOT = 'The Chariot'
     FORTITUDE = 'Fortitude'
     HERMIT = 'The Hermit'
-    WEEL_OF_FORTUNE = 'Wheel Of Fortune'
+    WHEEL_OF_FORTUNE = 'Wheel Of Fortune'
     JUSTICE = 'Justice'
     HANGED_MAN ='The Hanged Man'
     DEATH = 'Death'
@@ -60,34 +103,65 @@ class MajorArcanaName(StrEnum):
     JUDGMENT = 'The Last Judgment'
     WORLD = 'The World'
 
+# plain lookups from the (lowercased) strings tarotapi.dev uses to our enums, built once, so parsing
+# the payload is a dict get rather than a trip through Enum's value coercion
+_MAJOR_BY_NAME = {name.value.lower(): name for name in MajorArcanaName}
+_SUIT_BY_NAME = {suit.value.lower(): suit for suit in Suit}
+_NUM_BY_NAME = {number.value.lower(): number for number in CardNumber}
 
-class Card:
-    pass
+# display_name and humus_path are worked out once, when the card is made, rather than on every lookup;
+# the hash too, since cards get used as dict keys
+# humus paths are tuples of (interned) names, e.g. ("minor", "WANDS", "ACE") rather than "/minor/WANDS/ACE",
+# so the shared prefixes aren't stored over and over and a lookup never builds or parses a string
 
-@dataclass
-class MajorArcana(Card):
+@dataclass(frozen=True, slots=True)
+class MajorArcana:
     name : MajorArcanaName
+    display_name: str = field(init=False, repr=False, compare=False)
+    humus_path: tuple = field(init=False, repr=False, compare=False)
+    _hash: int = field(init=False, repr=False, compare=False)
 
-    @property
-    def display_name(self):
-        return self.name.value
+    def __post_init__(self):
+        object.__setattr__(self, "display_name", self.name.value)
+        object.__setattr__(self, "humus_path", ("major", self.name.name))
+        object.__setattr__(self, "_hash", hash((self.name,)))
 
-    @property
-    def humus_path(self):
-        return "/major/%s" % self.name.name
+    def __hash__(self):
+        return self._hash
 
-@dataclass
-class MinorArcana(Card):
+@dataclass(frozen=True, slots=True)
+class MinorArcana:
     suit: Suit
     number: CardNumber
+    display_name: str = field(init=False, repr=False, compare=False)
+    humus_path: tuple = field(init=False, repr=False, compare=False)
+    _hash: int = field(init=False, repr=False, compare=False)
 
-    @property
-    def display_name(self):
-        return "%s of %s" % (self.number.value, self.suit.value)
+    def __post_init__(self):
+        object.__setattr__(self, "display_name", "%s of %s" % (self.number.value, self.suit.value))
+        object.__setattr__(self, "humus_path", ("minor", self.suit.name, self.number.name))
+        object.__setattr__(self, "_hash", hash((self.suit, self.number)))
 
-    @property
-    def humus_path(self):
-        return "/minor/%s/%s" % (self.suit.name, self.number.name)
+    def __hash__(self):
+        return self._hash
+
+Card = Union[MajorArcana, MinorArcana]
+
+# what draw_scene hands back until it takes real input; cards are frozen, so one shared tuple will do
+_PLACEHOLDER_DRAW = (MajorArcana(MajorArcanaName.WORLD), MajorArcana(MajorArcanaName.FOOL), MajorArcana(MajorArcanaName.TOWER))
+
+@functools.cache
+def _card_catalogue():
+    """Every card in the deck, built once, keyed the way tarotapi.dev describes them (lowercased)"""
+    catalogue = {}
+    for name_key, name in _MAJOR_BY_NAME.items():
+        catalogue[("major", name_key)] = MajorArcana(name)
+    for suit_key, suit in _SUIT_BY_NAME.items():
+        for number_key, number in _NUM_BY_NAME.items():
+            catalogue[("minor", suit_key, number_key)] = MinorArcana(suit, number)
+    return catalogue
+
+_EMPTY = () # shared, immutable "nothing here yet"
 
 class FakeHumus:
     def __init__(self, data):
@@ -98,50 +172,143 @@ class FakeHumus:
 
     def get(self, path):
         # Not quite the samentics of real Humus, but for our purposes it's fine for now
-        if path in self.data:
-            return self.data[path]
-        else:
-            return []
+        return self.data.get(path, _EMPTY)
+
+def _read_tarot_cache():
+    """The cached tarotapi.dev response, or None if there isn't a usable one"""
+    try:
+        cached = _loads(TAROT_CACHE_PATH.read_bytes())
+    except (OSError, ValueError):
+        return None # missing, unreadable or half-written; treat it as a miss
+    if not isinstance(cached, dict) or cached.get("url") != TAROT_API_URL or "payload" not in cached:
+        return None # not ours, or cached from somewhere else
+    return cached
+
+def _write_tarot_cache(payload, last_modified):
+    # written alongside and then swapped into place, so an interrupted run can't leave a truncated cache
+    TAROT_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", dir=TAROT_CACHE_PATH.parent, suffix=".tmp", delete=False) as f:
+        json.dump({
+            "url": TAROT_API_URL,
+            "last_modified": last_modified,
+            "payload": payload
+        }, f)
+    os.replace(f.name, TAROT_CACHE_PATH)
+
+def _load_tarot_cards(refresh=False):
+    """Returns the tarotapi.dev payload, from the local disk cache where we can.
+    With `refresh`, go back to the network regardless."""
+    cached = None if refresh else _read_tarot_cache()
+    if cached is not None and time.time() - TAROT_CACHE_PATH.stat().st_mtime < TAROT_CACHE_TTL:
+        return cached["payload"]
 
-def populated_fake_humus():
+    headers = dict(_HTTP_HEADERS)
+    if cached and cached.get("last_modified"):
+        # cheap revalidation; the server can just say "nothing's changed"
+        headers["If-Modified-Since"] = cached["last_modified"]
+    try:
+        response = _http.request("GET", TAROT_API_URL, headers=headers)
+        if response.status >= 400:
+            raise urllib3.exceptions.HTTPError("tarotapi.dev responded with %d" % response.status)
+    except urllib3.exceptions.HTTPError:
+        if cached is None:
+            raise
+        return cached["payload"] # stale, but better than nothing
+    if response.status == 304:
+        TAROT_CACHE_PATH.touch() # still good, so restart the TTL clock
+        return cached["payload"]
+    payload = _loads(response.data)
+    _write_tarot_cache(payload, response.headers.get("Last-Modified"))
+    return payload
+
+def populated_fake_humus(refresh=False):
     # TODO This builds a fake humus with interpretations nabbed from tarotapi.dev. We will replace it
     # with a prepopulated real humus shortly.
-    tarot = requests.get("https://tarotapi.dev/api/v1/cards").json()
+    tarot = _load_tarot_cards(refresh)
+    catalogue = _card_catalogue()
     seed_data = {}
     for card_data in tarot["cards"]:
         if card_data["type"] == "major":
-           card = MajorArcana(MajorArcanaName(card_data["name"]))
+           card = catalogue[("major", card_data["name"].lower())]
         elif card_data["type"] == "minor":
-           suit = Suit(card_data["suit"])
-           number = CardNumber(card_data["value"])
-           card = MinorArcana(suit, number)
-        seed_data[card.humus_path] = card_data["meaning_up"].split(";")
+           card = catalogue[("minor", card_data["suit"].lower(), card_data["value"].lower())]
+        # stripped once here, and interned, since the same phrases turn up under more than one card
+        meanings = (meaning.strip() for meaning in card_data["meaning_up"].split(";"))
+        seed_data[card.humus_path] = tuple(sys.intern(meaning) for meaning in meanings if meaning)
     return FakeHumus(seed_data)
 
 class QuerentHumusClient:
-    def __init__(self):
-        self.humus = populated_fake_humus() #TODO put a real humus in here.
+    def __init__(self, refresh=False):
+        self._humus = None
+        self._humus_lock = threading.Lock() # prefetches can race to populate it
+        self._refresh = refresh
+        self._pool = ThreadPoolExecutor(max_workers=2)
+        self._prefetched = {} # card -> future of its interpretations
+
+    @property
+    def humus(self):
+        # populated on first use (which __enter__ makes happen in the background), so the network fetch
+        # doesn't hold up the welcome scene
+        if self._humus is None:
+            with self._humus_lock:
+                if self._humus is None:
+                    self._humus = populated_fake_humus(self._refresh) #TODO put a real humus in here.
+        return self._humus
+
+    def close(self):
+        """Let go of the prefetch pool; any lookups still in flight are left to finish"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._prefetched.clear()
+
+    def __enter__(self):
+        # start populating humus straight away, so the fetch overlaps the welcome and the query typing
+        # rather than waiting for the first prefetch (if it fails, the first real use tries again)
+        self._pool.submit(lambda: self.humus)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     """A thing that's responsible for indexing everything in humus so that we can get it back in ways that are useful"""
     def save_interpretations(self, reading: [Card], interpretation: str):
         """Save the query, drawn cards, interpretation, in whatever manner we decide"""
+        # once humus actually persists things, this is where a whole session record (query, cards,
+        # interpretation) gets encoded; cards are already frozen, slotted and hashable, so something like
+        # msgspec.Struct (with a tagged union for the two card kinds) would slot in here without much fuss
         for card in reading:
-            self.humus.insert(card.humus_path, str)
+            self.humus.insert(card.humus_path, interpretation)
 
-    def get_previous_interpretations(self, reading : [Card]) -> [str]:
-        """Returns accumulated 'meanings' for the drawn cards and this query"""
-        interpretations = []
-        for card in reading:
-            interpretations += self.humus.get(card.humus_path)
-        return interpretations
+    def prefetch(self, card: Card):
+        """Start looking up a card's interpretations in the background, while the querent draws the next one"""
+        if card not in self._prefetched:
+            self._prefetched[card] = self._pool.submit(self._lookup, card)
+
+    def _lookup(self, card: Card):
+        return self.humus.get(card.humus_path)
+
+    def get_previous_interpretations(self, reading : [Card]) -> Iterator[str]:
+        """Returns accumulated 'meanings' for the drawn cards and this query, lazily; there could be a lot of them"""
+        return itertools.chain.from_iterable(self._interpretations_for(card) for card in reading)
+
+    def _interpretations_for(self, card: Card):
+        future = self._prefetched.pop(card, None)
+        if future is not None:
+            return future.result()
+        return self._lookup(card)
 
 class QueryHomeostat:
     """A thing that's responsible for the 'query refinement' process -
     deciding if a query is sufficiently 'refined' and producing prompts for further elicitation"""
+    def __init__(self):
+        self._rng = random.Random() # our own, rather than sharing the module-level one
+
     def is_stable(self, queries : [str]) -> bool:
         """Evalute if the query is 'good enough' to proceed:"""
         # TODO Justin here is a place to add homeostat logic
-        return random.random() > 0.5 # A coin toss, for now
+        # when it turns into an actual score over the queries (similarity, variance, entropy...), keep the
+        # number-crunching in a plain module-level function over a float array, separate from turning the
+        # queries into features; that way it can go under numba's @njit(cache=True) later without a rewrite
+        return bool(self._rng.getrandbits(1)) # A coin toss, for now
 
     def prompt_for_refinement(self, queries : [str]) -> str:
         """Get a prompt to give to the user to refine the query"""  # or "regulate variety"
@@ -150,39 +317,53 @@ class QueryHomeostat:
 
 def welcome_scene():
     """Here we do the scene setting"""
-    fancy_print("Greetings, querent", font="double")
-    fancy_print("This is a welcome message which is a placeholder")
+    fancy_print_all([
+        ("Greetings, querent", "double"),
+        ("This is a welcome message which is a placeholder", DEFAULT_FONT)
+    ])
 
 def homeostat_scene():
     """Here we do the 'query elicitation' and refinement"""
     homeostat = QueryHomeostat()
     queries = []
+    # the prompt never changes, so render it once here rather than on every turn of the loop
+    query_prompt = _render("query> ", DEFAULT_FONT)
     fancy_print("What is your query, querent?", font="vip")
-    queries.append(fancy_input("query> "))
+    queries.append(input(query_prompt))
     while not homeostat.is_stable(queries):
         prompt = homeostat.prompt_for_refinement(queries)
         fancy_print(prompt, font="tiny")
-        queries.append(fancy_input("query> "))
+        queries.append(input(query_prompt))
     # TODO: The user explicitly consents to continue with the current formulation.
     # What happens if they say no? (Start from scratch? continue refining? Edit?)
     return queries[-1]
 
-def draw_scene(query):
-    """Here we guide the user in drawing cards, and receive their responses"""
-    # TODO guide the user to read and input cards, and return the real ones.
-    return [MajorArcana(MajorArcanaName.WORLD), MajorArcana(MajorArcanaName.FOOL), MajorArcana(MajorArcanaName.TOWER)]
+def draw_scene(query) -> Iterator[Card]:
+    """Here we guide the user in drawing cards, and receive their responses, one card at a time"""
+    # TODO guide the user to read and input cards, and yield the real ones as they're entered.
+    yield from _PLACEHOLDER_DRAW
+
+def _reservoir(items, k):
+    """A uniform random sample of up to k items, taken in one pass without holding on to the rest (Algorithm R)"""
+    reservoir = []
+    for i, item in enumerate(items):
+        if i < k:
+            reservoir.append(item)
+        else:
+            j = random.randrange(i + 1)
+            if j < k:
+                reservoir[j] = item
+    return reservoir
 
 def interpretation_scene(query, result, previous_interpretations):
     """Here we take the user through the process of interpretation of the reading,
     with reference to their query, and to relevant previous interpretations"""
-    fancy_print("You asked: \"%s\"" % query, font="tiny")
-    fancy_print("And the cards said: ")
-    for card in result:
-        fancy_print(" - %s" % card.display_name, font="wiggly")
-    fancy_print("Some previous interpretations of these cards might suggest: ", font="tiny")
-    for interpretation in random.sample(previous_interpretations, k=min(5, len(previous_interpretations))):
-        fancy_print(" - %s" % interpretation, font="tiny")
-    fancy_print("Do you have any reflection to add?", font="vip")
+    lines = [("You asked: \"%s\"" % query, "tiny"), ("And the cards said: ", DEFAULT_FONT)]
+    lines.extend((" - %s" % card.display_name, "wiggly") for card in result)
+    lines.append(("Some previous interpretations of these cards might suggest: ", "tiny"))
+    lines.extend((" - %s" % interpretation, "tiny") for interpretation in _reservoir(previous_interpretations, 5))
+    lines.append(("Do you have any reflection to add?", "vip"))
+    fancy_print_all(lines)
     return fancy_input("Your interpretation >")
 
 def farewell_scene():
@@ -192,22 +373,25 @@ def farewell_scene():
 app = typer.Typer()
 
 @app.command()
-def run():
-    humus = QuerentHumusClient()
-    # First welcome the user.
-    welcome_scene()
-    # Then elicit and refine the query
-    query = homeostat_scene()
-    # Then direct the user to draw cards
-    result = draw_scene(query)
-    # Then get the previous interpretations from humus
-    previous_interpretations = humus.get_previous_interpretations(result)
-    # Then guide the user in interpreting the reading
-    interpretation = interpretation_scene(query, result, previous_interpretations)
-    # Then save away the new interpretation in humus
-    humus.save_interpretations(result, interpretation)
-    # Then say goodbye.
-    farewell_scene()
+def run(refresh: bool = typer.Option(False, "--refresh", help="Fetch the card meanings from tarotapi.dev again")):
+    with QuerentHumusClient(refresh) as humus:
+        # First welcome the user.
+        welcome_scene()
+        # Then elicit and refine the query
+        query = homeostat_scene()
+        # Then direct the user to draw cards, looking each one up in humus while they draw the next
+        result = []
+        for card in draw_scene(query):
+            humus.prefetch(card)
+            result.append(card)
+        # Then get the previous interpretations from humus
+        previous_interpretations = humus.get_previous_interpretations(result)
+        # Then guide the user in interpreting the reading
+        interpretation = interpretation_scene(query, result, previous_interpretations)
+        # Then save away the new interpretation in humus
+        humus.save_interpretations(result, interpretation)
+        # Then say goodbye.
+        farewell_scene()
 
 if __name__ == "__main__":
     app()
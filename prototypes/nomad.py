@@ -1,17 +1,35 @@
-import typer
+import contextlib
+import heapq
+import sys
 import time
 import random
 from datetime import datetime, timedelta
-from dataclasses import dataclass, field
-from typing import Optional, Dict, List, Set, Any
-from enum import Enum
+from dataclasses import dataclass, field, replace
+from typing import Optional, Dict, List, Set, FrozenSet, Any
+from enum import Enum, StrEnum
 
-class Command(str, Enum):
+# typer (and click underneath it) is imported inside the functions that talk to the querent, rather than
+# up here; it's a heavy import, and this way the rest of the module loads without paying for it
+
+class Command(StrEnum):
     traverse = "traverse"
     observe = "observe"
     exit = "exit"
 
-class ObjectCategory(str, Enum):
+# a straight dict lookup for the REPL prompt, rather than going through Enum's value coercion every turn
+_CMD_MAP: Dict[str, Command] = {command.value: command for command in Command}
+
+def _parse_cmd(value: str) -> Command:
+    try:
+        return _CMD_MAP[value.strip().lower()]
+    except KeyError:
+        # BadParameter rather than ValueError: click re-prompts on either, but only shows BadParameter's text
+        import typer
+        raise typer.BadParameter(f"{value!r} is not one of: {', '.join(_CMD_MAP)}") from None
+
+MAX_CONFIGURED_PARTS = 7      # arbitrary limit for "smallness" (yessssssss)
+
+class ObjectCategory(StrEnum):
     PERSONAL = "personal"           # objects with personal significance
     EPHEMERAL = "ephemeral"         # temporary or changing elements
     PERSISTENT = "persistent"       # stable environmental features
@@ -22,41 +40,96 @@ class TimePhase(Enum):
     DUSK = "dusk"
     NIGHT = "night"
 
-def main():
-    cathedral = NomadCathedral()
-    typer.echo("The space forms around you, borrowing from your surroundings...")
-    typer.echo(cathedral.establish_presence())
+# one clock reading per REPL turn, shared by everything that gets timestamped during that turn
+_turn_now: Optional[datetime] = None
+
+@contextlib.contextmanager
+def _turn():
+    """Everything timestamped inside this block gets the same time"""
+    global _turn_now
+    _turn_now = datetime.now()
+    try:
+        yield
+    finally:
+        _turn_now = None
+
+def turn_now() -> datetime:
+    """The time of the current turn (or just now, outside of one)"""
+    return _turn_now or datetime.now()
+
+class EchoBuffer:
+    """Holds what's to be said to the querent until they're next asked something, then says it in one write"""
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def echo(self, message: str):
+        self.lines.append(message + "\n")
+
+    def flush(self):
+        if self.lines:
+            import typer
+            typer.echo("".join(self.lines), nl=False)     # still via click, so styling is stripped off-terminal
+            self.lines.clear()
+
+    def prompt(self, text: str, **kwargs):
+        import typer
+        self.flush()
+        return typer.prompt(text, **kwargs)
+
+def _do_traverse(cathedral):
+    return cathedral.space.traverse(
+        cathedral.out.prompt("Where would you like to go?", type=str)
+    )
+
+def _do_observe(cathedral):
+    return cathedral.borrow_scenery()
+
+# built once, rather than on every turn of the loop
+_DISPATCH = {
+    Command.traverse: _do_traverse,
+    Command.observe: _do_observe
+}
+
+def main(theatrical: bool = False):
+    """With --theatrical, pause between prompts to give the querent time to look around."""
+    import typer
+    cathedral = NomadCathedral(theatrical=theatrical)
+    out = cathedral.out
+    out.echo("The space forms around you, borrowing from your surroundings...")
+    with _turn():
+        out.echo(cathedral.establish_presence())
 
     while True:
         try:
-            command = typer.prompt(
+            command = out.prompt(
                 "What would you like to do?",
-                type=Command
+                type=_parse_cmd
             )
 
-            if command == Command.exit:
-                typer.echo("The cathedral melts back into potential...")
+            if command is Command.exit:
+                out.echo("The cathedral melts back into potential...")
+                out.flush()
                 break
 
-            commands = {
-                Command.traverse: lambda: cathedral.space.traverse(
-                    typer.prompt("Where would you like to go?", type=str)
-                ),
-                Command.observe: cathedral.borrow_scenery
-            }
+            with _turn():
+                result = _DISPATCH[command](cathedral)
+            out.echo(result)
 
-            result = commands[command]()
-            typer.echo(result)
+        except typer.Abort:
+            # ctrl-c or end of input at a prompt; re-prompting would just spin
+            out.echo("\nThe cathedral melts back into potential...")
+            out.flush()
+            break
+        except (KeyError, ValueError) as e:
+            # anything else is a bug, and should surface as one (with its own traceback)
+            out.echo(f"Error: {e}")
 
-        except Exception as e:
-            typer.echo(f"Error: {e}")
-
-@dataclass
+@dataclass(slots=True)
 class BorrowedScenery:
     celestial: str
     proximate: str
     ambient: str
-    timestamp: datetime = field(default_factory=datetime.now)
+    timestamp: datetime = field(default_factory=turn_now)
 
 class Context:
     """The querent's immediate situation and temporal state"""
@@ -85,7 +158,7 @@ class ThresholdType(Enum):
     MATERIAL = "material"       # between forms/substances
     PERCEPTUAL = "perceptual"   # between ways of seeing/experiencing
 
-@dataclass
+@dataclass(slots=True)
 class Threshold:
     """A point of resistance, transition, or transformation"""
     name: str
@@ -106,7 +179,7 @@ class Threshold:
     def record_crossing(self, context: Context):
         """Record crossing attempt and outcome"""
         self.crossing_history.append({
-            'timestamp': datetime.now(),
+            'timestamp': turn_now(),
             'context': context.snapshot(),
             'intensity': self.intensity
         })
@@ -118,8 +191,9 @@ class PartState(Enum):
     RESTING = 'resting'                         # temporarily unavailable
     TRANSITIONING = 'transitioning'             # between states (not clear what this means in practice)
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 # make immutable for hashability
+# (slotted, like the other dataclasses here; the hand-written __hash__/__eq__ below are kept, so identity stays keyed on `id`)
 class Part:
     id: str
     nature: tuple[str, ...]                     # material, conceptual, hybrid, basically anything
@@ -131,6 +205,11 @@ class Part:
     last_used: Optional[datetime] = None
     rest_period: Optional[timedelta] = None
 
+    def __post_init__(self):
+        # ids key everything (stock, configurations, networks); interned, comparing them is a pointer check,
+        # even for ids built from whatever the querent typed in
+        object.__setattr__(self, 'id', sys.intern(self.id))
+
     def calculate_rest_period(self) -> timedelta:
     # [?] what factors influence rest?
     # [?] how do temporal factors influence part availability
@@ -140,11 +219,14 @@ class Part:
         return hash(self.id)
     
     def __eq__(self, other):
-        if not isinstance(other, Part):
+        # parts get compared a lot (every set add); identity first, and an exact type check rather than isinstance
+        if self is other:
+            return True
+        if type(other) is not Part:
             return NotImplemented
         return self.id == other.id
 
-@dataclass
+@dataclass(slots=True)
 class PartIdentity:
     id: str
     relations: Dict[str, float] = field(default_factory=dict)
@@ -169,7 +251,7 @@ class PartNetwork:
             self.parts[part_id].process_interaction(context)
             self._update_network_relations(part_id, parts - {part_id})
 
-@dataclass
+@dataclass(slots=True)
 class Configuration:
     """Dynamic configuration that evolves with context"""
     parts: Set[str]
@@ -183,42 +265,67 @@ class Configuration:
         self._adjust_relations()
         self._reconsider_parts()
 
-    def dissolve(self):
+    def dissolve(self, stock: "Stock"):
         """Return parts to stock with updated histories"""
-        for part in self.parts:
+        timestamp, context = self.timestamp, self.context
+        duration = turn_now() - timestamp     # the same for every part, so worked out once
+        parts = stock.parts
+        for part_id in self.parts:
+            try:
+                part = parts[part_id]
+            except KeyError:
+                continue
             part.configurations.append({
-                'timestamp': self.timestamp,
-                'context': self.context,
-                'duration': datetime.now() - self.timestamp
+                'timestamp': timestamp,
+                'context': context,
+                'duration': duration
             })
-            part.state = PartState.RESTING
-            part.rest_period = self._calculate_rest_period(part)
+            stock.mark_state(part_id, PartState.RESTING, rest_period=self._calculate_rest_period(part))
 
 class Stock:
 # [!] need to write a proper part selection algorithm
     def __init__(self):
         self.parts: Dict[str, Part] = {}
+        # kept up to date as parts come and go, rather than rescanned; every state change goes through
+        # add_part/mark_state. A dict rather than a set, so it keeps the order parts became available in
+        # (which is how ties in selection are broken)
+        self.available_ids: Dict[str, None] = {}
 
     def add_part(self, part: Part):
         """Add a new part to stock"""
         self.parts[part.id] = part
+        if part.state is PartState.AVAILABLE:
+            self.available_ids.setdefault(part.id)
+        else:
+            self.available_ids.pop(part.id, None)
+
+    def mark_state(self, part_id: str, new_state: PartState, **changes: Any):
+        """Move a part into a new state (along with any other `changes` to it), keeping track of what's available"""
+        # parts are frozen, so the stocked part is swapped for an updated copy
+        self.add_part(replace(self.parts[part_id], state=new_state, **changes))
     
-    def select_parts(self, context: Context) -> List[Part]:
+    def select_parts(self, context: Context, k: int = MAX_CONFIGURED_PARTS) -> List[Part]:
         """Select parts for a new configuration"""
-        available = [p for p in self.parts.values() 
-                    if p.state == PartState.AVAILABLE]
+        parts = self.parts
+        available = [parts[part_id] for part_id in self.available_ids]
         # consider: context alignment, historical patterns, rest periods
-        return self._filter_and_rank(available, context)
+        return self._filter_and_rank(available, context, k)
 
-    def _filter_and_rank(self, parts: List[Part], context: Context) -> List[Part]:
-        return sorted(parts, key=lambda p: self._calculate_fitness(p, context), reverse=True)
-        # no idea what this second bit is doingggggg
+    def _filter_and_rank(self, parts: List[Part], context: Context, k: int) -> List[Part]:
+        # only the top k are ever wanted, so no need to sort the lot; each fitness is worked out once,
+        # and the (negated) index breaks ties in stock order, so parts themselves never get compared
+        fitness = self._calculate_fitness
+        scored = [(fitness(p, context), -i, p) for i, p in enumerate(parts)]
+        return [p for _, _, p in heapq.nlargest(k, scored)]
 
     def _calculate_fitness(self, part: Part, context: Dict[str, Any]) -> float:
         # placeholder fitness calculation
+        # once this becomes a real weighted sum (ephemerality, time since last use, nature vs context), score the
+        # whole stock in one go: keep the per-part features in parallel arrays rebuilt on add_part / mark_state,
+        # and write the scoring as a plain function over those arrays so numba's @njit(cache=True) can take it
         return 1.0
 
-@dataclass
+@dataclass(slots=True)
 class CathedralState:
 # [?] what persists between sessions, and what resets?
     configuration: Configuration
@@ -249,16 +356,21 @@ class ConfigurationCycle:
 
     def dissolve_current(self):     # 'dissolve' is a tad strong
         """Return parts to inventory with updated histories"""
-        for part_id in self.current_configuration.active_parts:
-            part = self.stock.parts.get(part_id)
-            if part:
-                part.configurations.append({
-                    'timestamp': self.current_configuration.timestamp,
-                    'context': self.current_configuration.context,
-                    'duration': datetime.now() - self.current_configuration.timestamp
-                })
-                part.state = PartState.RESTING
-                part.rest_period = self.calculate_rest_period()
+        current = self.current_configuration
+        timestamp, context = current.timestamp, current.context
+        duration = turn_now() - timestamp     # the same for every part, so worked out once
+        parts = self.stock.parts
+        for part_id in current.active_parts:
+            try:
+                part = parts[part_id]
+            except KeyError:
+                continue
+            part.configurations.append({
+                'timestamp': timestamp,
+                'context': context,
+                'duration': duration
+            })
+            self.stock.mark_state(part_id, PartState.RESTING, rest_period=self.calculate_rest_period())
 
 class Environment:
     """The Nomad Cathedral's current manifestation"""
@@ -280,10 +392,41 @@ class Environment:
         self.adjust_configuration()                     # [?] what configurations are possible?
         self.update_ephemera()                          # [?] What constitutes ephemera?
 
-@dataclass
+def _build_active_thresholds(previous_focus: Optional[str], current_focus: Optional[str],
+                             dawn: bool) -> tuple[Threshold, ...]:
+    """The thresholds active for a given move and time of day (see Space._find_active_thresholds)"""
+    active_thresholds = []
+
+    # consider transitions between anchors
+    if previous_focus and current_focus:
+        active_thresholds.append(
+            Threshold(
+                name=f"{previous_focus}_to_{current_focus}",
+                connecting=(previous_focus, current_focus),
+                conditions={},
+                qualities={"transitional"},
+                intensity=0.6
+            )
+        )
+
+    # consider temporal thresholds
+    if dawn:
+        active_thresholds.append(
+            Threshold(
+                name="dawn_threshold",
+                connecting=("sky_window", "sky_window"),
+                conditions={},
+                qualities={"temporal", "luminous"},
+                intensity=0.7
+            )
+        )
+
+    return tuple(active_thresholds)
+
+@dataclass(slots=True)
 class Anchor:
     """A fixed point"""
-    connections: List[str]
+    connections: FrozenSet[str]                 # a set, so checking a move is a hash lookup rather than a scan
     description: str
     permanent: bool = True
 
@@ -292,11 +435,11 @@ class Space:
     def __init__(self):
         self.anchors: Dict[str, Anchor] = {
             "hearth": Anchor(
-                connections=["sky_window"],
+                connections=frozenset({"sky_window"}),
                 description="A central space for contemplation and interpretation"
                 ),
             "sky_window": Anchor(
-                connections=["hearth"],
+                connections=frozenset({"hearth"}),
                 description="An opening to observe the sky and weather"
                 )
             }
@@ -304,6 +447,10 @@ class Space:
         self.ephemera: List[Dict[str, Any]] = []        # a more fluid, dynamic layer of "stuff"
         self.current_focus: Optional[str] = "hearth"    # current point of attention
         self.previous_focus: Optional[str] = None       # for tracking transitions
+        # active thresholds by (previous focus, current focus, dawn?), worked out once per combination; these
+        # are only templates, and each lookup hands out copies of them, so nothing recorded on a threshold
+        # carries over into a later turn. There are only so many pairs of anchors, so nothing ever needs evicting
+        self._threshold_cache: Dict[tuple[Optional[str], Optional[str], bool], tuple[Threshold, ...]] = {}
 
     def sense_space(self) -> Dict[str,Any]:
         """Return current spatial configuration and awareness"""
@@ -316,34 +463,18 @@ class Space:
     
     def _find_active_thresholds(self) -> List[Threshold]:
         """Identify currently active thresholds"""
-        active_thresholds = []
-
-        # consider transitions between anchors
-        if self.previous_focus and self.current_focus:
-            active_thresholds.append(
-                Threshold(
-                    name=f"{self.previous_focus}_to_{self.current_focus}",
-                    intensity=0.6,
-                    qualities=["transitional"],
-                    anchors={self.previous_focus, self.current_focus}
-                )
-            )
-
-        # consider temporal thresholds
-        current_time = datetime.now()
-        if 5 <= current_time.hour <= 7:
-            active_thresholds.append(
-                Threshold(
-                    name="dawn_threshold",
-                    intensity=0.7,
-                    qualities=["temporal", "luminous"],
-                    anchors={"sky_window"}
-                )
-            )
-            
-        return active_thresholds
+        current_time = turn_now()
+        key = (self.previous_focus, self.current_focus, 5 <= current_time.hour <= 7)
+        thresholds = self._threshold_cache.get(key)
+        if thresholds is None:
+            thresholds = self._threshold_cache[key] = _build_active_thresholds(*key)
+        # fresh containers too, since Threshold's fields are mutable
+        return [replace(t, conditions=dict(t.conditions), qualities=set(t.qualities),
+                        crossing_history=list(t.crossing_history))
+                for t in thresholds]
 
     def traverse(self, direction: str) -> str:
+        direction = sys.intern(direction)   # typed in; becomes the focus, which keys the anchor lookups
         if direction in self.anchors[self.current_focus].connections:
             self.previous_focus = self.current_focus
             self.current_focus = direction
@@ -373,13 +504,13 @@ class Space:
         self.thresholds = self._adjust_thresholds(borrowed)
         return self._generate_atmosphere()
 
-@dataclass
+@dataclass(slots=True)
 class NavigationContext:
     temporal_phase: str
     environmental_conditions: Dict[str, Any]
     recent_crossings: List[str] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class Constellation:
 # [?] maybe better to name this 'assemblage'? or something else entirely?
     """A specific arrangement of parts in space and time"""
@@ -399,7 +530,7 @@ class Constellation:
     def arrange(self) -> Configuration:
         """Transform constellation into concrete configuration"""
         return Configuration(
-            parts=set(self.elements),
+            parts=self.elements,            # already a set of ids; no need for another copy
             timestamp=self.temporal_context,
             context=self._generate_context(),
             thresholds=self.thresholds
@@ -425,60 +556,71 @@ class TemporalFlow:
         self.configuration_history: List[Dict] = []
         self.session_count: int = 0
 
-@dataclass
+@dataclass(slots=True)
 class GatheredObject:
     name: str
     category: ObjectCategory
     description: str
     significance: str
-    first_noticed: datetime = field(default_factory=datetime.now)
-    last_seen: datetime = field(default_factory=datetime.now)
+    first_noticed: datetime = field(default_factory=turn_now)
+    last_seen: datetime = field(default_factory=turn_now)
     associations: List[str] = field(default_factory=list)
     qualities: Dict[str, float] = field(default_factory=dict)
 
     def update_presence(self, description: Optional[str] = None):
         """Record that object was seen again, with optional description updates"""
-        self.last_seen = datetime.now()
+        self.last_seen = turn_now()
         if description:
             self.description = description
 
+# prompts and descriptions are fixed; built once rather than per gathering / per call
+_PROMPTS_BY_CATEGORY: Dict[ObjectCategory, tuple[str, ...]] = {
+    ObjectCategory.PERSONAL: (
+        "What object near you holds meaning?",
+        "What's something you keep close?",
+        "Which object here has a story?"
+    ),
+    ObjectCategory.EPHEMERAL: (
+        "What's temporary or fleeting?",
+        "What might be different tomorrow?",
+        "What traces of activity do you notice?"
+    ),
+    ObjectCategory.PERSISTENT: (
+        "What's always present in this space?",
+        "What forms the backbone of this environment?",
+        "What here remains constant?"
+    )
+}
+
+_CATEGORY_DESCRIPTIONS: Dict[ObjectCategory, str] = {
+    ObjectCategory.PERSONAL: "Personal objects",
+    ObjectCategory.EPHEMERAL: "Temporary features",
+    ObjectCategory.PERSISTENT: "Permanent elements"
+}
+
 class ObjectGathering:
     """Structured gathering of objects from the user's environment"""
-    
-    def __init__(self):
+    def __init__(self, theatrical: bool = False):
         self.gathered_objects: Dict[str, GatheredObject] = {}
-        self.gathering_prompts = {
-            ObjectCategory.PERSONAL: [
-                "What object near you holds meaning?",
-                "What's something you keep close?",
-                "Which object here has a story?"
-            ],
-            ObjectCategory.EPHEMERAL: [
-                "What's temporary or fleeting?",
-                "What might be different tomorrow?",
-                "What traces of activity do you notice?"
-            ],
-            ObjectCategory.PERSISTENT: [
-                "What's always present in this space?",
-                "What forms the backbone of this environment?",
-                "What here remains constant?"
-            ]
-        }
+        self.theatrical = theatrical
 
-    def gather_objects(self, typer) -> List[GatheredObject]:
+    def gather_objects(self, typer, out: Optional[EchoBuffer] = None) -> List[GatheredObject]:
         """Main gathering loop with structured prompts"""
-        typer.echo("\nLet's gather some objects from your environment...")
+        if out is None:
+            out = EchoBuffer()
+        out.echo("\nLet's gather some objects from your environment...")
         gathered = []
 
         # gather one object from each category
         for category in ObjectCategory:
-            typer.echo(f"\n{self._get_category_description(category)}:")
-            prompts = self.gathering_prompts[category]
+            out.echo(f"\n{self._get_category_description(category)}:")
+            prompts = _PROMPTS_BY_CATEGORY[category]
 
             # get random prompt for variety
-            prompt = random.choice(prompts)
+            prompt = prompts[random.randrange(len(prompts))]
 
             # gather object details
+            out.flush()
             name = typer.prompt(prompt)
             if name.lower() == 'skip':
                 continue
@@ -505,18 +647,14 @@ class ObjectGathering:
             gathered.append(obj)
             
             # Brief pause
-            time.sleep(0.5)
+            if self.theatrical:
+                time.sleep(0.5)
 
         return gathered
 
     def _get_category_description(self, category: ObjectCategory) -> str:
         """Get human-readable category descriptions"""
-        descriptions = {
-            ObjectCategory.PERSONAL: "Personal objects",
-            ObjectCategory.EPHEMERAL: "Temporary features",
-            ObjectCategory.PERSISTENT: "Permanent elements"
-        }
-        return descriptions[category]
+        return _CATEGORY_DESCRIPTIONS[category]
 
     def integrate_objects(self, space: Space, objects: List[GatheredObject]):
         """Integrate gathered objects into the cathedral space"""
@@ -527,7 +665,7 @@ class ObjectGathering:
                     "type": "gathered_object",
                     "name": obj.name,
                     "description": obj.description,
-                    "created_at": datetime.now(), 
+                    "created_at": turn_now(), 
                     "duration": 3600
                 })
             # create more persistent elements for personal and persistent objects
@@ -543,12 +681,14 @@ class ObjectGathering:
                 space.stock.add_part(part)
 
 class NomadCathedral:
-    def __init__(self):
+    def __init__(self, theatrical: bool = False):
         self.stock = Stock()
         self.space = Space()
         self.borrowed_scenery: Optional[BorrowedScenery] = None
         self.configured_parts: Set[str] = set()
         self.current_phase = TimePhase.DAWN
+        self.theatrical = theatrical    # pauses between prompts are for effect only; off unless asked for
+        self.out = EchoBuffer()
 
     def establish_presence(self):
         """Initial sessional assembly, configuring cathedral from stock"""
@@ -588,28 +728,32 @@ class NomadCathedral:
             self.stock.add_part(part)
 
     def retrieve_stock(self) -> Set[str]:
-        return {part_id for part_id, part in self.stock.parts.items() if part.state == "available"}
+        return set(self.stock.available_ids)
 
     def configure_apparatus(self, stock: Set[str], borrowed: Set[str]) -> Configuration:
         """Assemble cathedral from available parts"""
-        parts = self.select_elements(stock, borrowed)
-        constellation = self._form_constellation({part.id for part in parts})
+        _, part_ids = self.select_elements(stock, borrowed)
+        constellation = self._form_constellation(part_ids)
         return constellation.arrange()
     
-    def select_elements(self, stock: Set[str], borrowed: Set[str]) -> Set['Part']:
-        """Select elements for cathedral configuration based on stock and borrowed scenery"""
+    def select_elements(self, stock: Set[str], borrowed: Set[str]) -> tuple[Set['Part'], Set[str]]:
+        """Select elements for cathedral configuration based on stock and borrowed scenery;
+        returns the parts and their ids, collected together so callers needn't rebuild one from the other"""
         selected = set()
+        selected_ids = set()
         # add core elements from stock
         for part_id in stock:
             part = self.stock.parts.get(part_id)
             if part and self._is_compatible(part, borrowed):
                 selected.add(part)
+                selected_ids.add(part.id)
         # integrate borrowed elements
         for part_id in borrowed:
             part = self.stock.parts.get(part_id)
-            if part and len(selected) < 7:  # arbitrary limit for "smallness" (yessssssss)
+            if part and len(selected) < MAX_CONFIGURED_PARTS:
                 selected.add(part)
-        return selected
+                selected_ids.add(part.id)
+        return selected, selected_ids
     
     def _is_compatible(self, part: Part, borrowed: Set[str]) -> bool:
         """Check if a stock element is compatible with borrowed scenery"""
@@ -621,26 +765,34 @@ class NomadCathedral:
         # think about: cyclic observation patterns, layered sensory prompts, memory of previous borrowings
         # need to better embodying the sense of Shakkei, OF "CAPTURING LANDSCAPE ALIVE"
         """Gather environmental context through user interaction"""
-        typer.echo("Take a moment to observe your environment...")
-        time.sleep(2)
-
-        celestial = typer.prompt(
+        import typer
+        out = self.out
+        out.echo("Take a moment to observe your environment...")
+        if self.theatrical:
+            out.flush()                 # let the line be seen before the pause
+            time.sleep(2)
+
+        celestial = out.prompt(
             "Through gaps in the ceiling, you glimpse...",
             default="a vast expanse"
             )
 
-        typer.echo(typer.style("Let your gaze wander...", dim=True))
-        time.sleep(1)
+        out.echo(typer.style("Let your gaze wander...", dim=True))
+        if self.theatrical:
+            out.flush()
+            time.sleep(1)
 
-        proximate = typer.prompt(
+        proximate = out.prompt(
             "What draws your attention?",
             default="shadows and light"
         )
 
-        typer.echo(typer.style("What is present?", dim=True))
-        time.sleep(1)
+        out.echo(typer.style("What is present?", dim=True))
+        if self.theatrical:
+            out.flush()
+            time.sleep(1)
         
-        ambient = typer.prompt(
+        ambient = out.prompt(
             "The air carries...",
             default="a whisper of distant movement"
         )
@@ -663,7 +815,7 @@ class NomadCathedral:
             elements=elements,
             anchors=self.space.anchors,
             thresholds=space_thresholds + stock_thresholds,
-            temporal_context=datetime.now()
+            temporal_context=turn_now()
         )
 
     def establish_thresholds(self, configuration: Configuration) -> None:
@@ -685,4 +837,5 @@ class NomadCathedral:
         return Threshold(name=f"{part.id}_threshold", connecting=(part.id, part.id), conditions={}, qualities=set())
 
 if __name__ == "__main__":
+    import typer
     typer.run(main)
\ No newline at end of file
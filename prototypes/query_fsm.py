@@ -1,7 +1,16 @@
+import bisect
+import functools
+import logging
+import queue
+import sys
+import threading
+import time
 import typer
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional
 from datetime import datetime
-from enum import Enum, auto
+from enum import Enum, IntEnum, auto
 
 # structured prompting to elicit context
 # querent's immediate environment (could borrow from the Nomadic Cathedral prompting)
@@ -9,13 +18,54 @@ from enum import Enum, auto
 # temporal situation
 # etc.
 
-class QueryState(Enum):
-    INITIAL = auto()
+class QueryState(IntEnum):
+    # starting is just the way in to gathering context, and being done is a flag on the machine
+    # rather than somewhere to be, so neither gets a state of its own
     GATHERING_CONTEXT = auto()
     REFINING = auto()
     SETTING_BOUNDARIES = auto()
     SYNTHESISING = auto()
-    COMPLETE = auto()
+
+# need to give much more thought to this state machine
+# these stages need refinement and clarification
+# [?] how do they interact?
+# (built once here, with sets for the allowed moves, rather than on every transition)
+_TRANSITIONS: Dict[QueryState, FrozenSet[QueryState]] = {
+    QueryState.GATHERING_CONTEXT: frozenset({QueryState.REFINING}),
+    QueryState.REFINING: frozenset({QueryState.SETTING_BOUNDARIES, QueryState.GATHERING_CONTEXT}),
+    QueryState.SETTING_BOUNDARIES: frozenset({QueryState.SYNTHESISING, QueryState.REFINING}),
+    QueryState.SYNTHESISING: frozenset({QueryState.REFINING})                   # or complete(), from here
+}
+
+# the same table as bitmasks, indexed by state: bit j of _TRANSITION_MASKS[i] is set if i -> j is allowed
+_TRANSITION_MASKS = [0] * (max(QueryState) + 1)
+for _from, _tos in _TRANSITIONS.items():
+    for _to in _tos:
+        _TRANSITION_MASKS[_from] |= 1 << _to
+del _from, _tos, _to
+
+# what's asked on entering each state, and what the ContextGatherer asks (sharing the immediate questions)
+_IMMEDIATE_QUESTIONS = (
+    "Where are you right now?",
+    "What time of day is it?"
+)
+
+_TEMPORAL_QUESTIONS = (
+    "Think about the past few days. What's been on your mind?",
+    "Looking ahead, what are you anticipating?"
+)
+
+_ENVIRONMENTAL_QUESTIONS = (
+    "What's the energy like around you?",
+    "Are there any significant changes in your environment?"
+)
+
+_PROMPTS_BY_STATE: Dict[QueryState, tuple[str, ...]] = {
+    QueryState.GATHERING_CONTEXT: _IMMEDIATE_QUESTIONS + (
+        "How would you describe the atmosphere around you?",
+    )
+    # add other state-specific prompts
+}
 
 class Season(Enum):
     SPRING = "Spring"
@@ -23,105 +73,146 @@ class Season(Enum):
     AUTUMN = "Autumn"
     WINTER = "Winter"
 
+# (month, day) each season starts on, and the season in force before, between and after them;
+# by month and day rather than day of the year, so leap years don't shift the boundaries
+_SEASON_STARTS = ((3, 20), (6, 21), (9, 22), (12, 21))
+_SEASONS = (Season.WINTER, Season.SPRING, Season.SUMMER, Season.AUTUMN, Season.WINTER)
+
+@functools.lru_cache(maxsize=400)     # at most 366 days, so everything fits and nothing's ever evicted
+def _season_for(month: int, day: int) -> Season:
+    return _SEASONS[bisect.bisect_right(_SEASON_STARTS, (month, day))]
+
+@dataclass(slots=True)
+class ImmediateSituation:
+    time: datetime
+    season: Season
+    location: Optional[str] = None
+    atmosphere: Optional[str] = None
+    # current_activity: Optional[str] = None
+    # emotional_state: Optional[str] = None
+    # [?] what else?
+
 class Context:
     def __init__(self):
-        self.immediate_situation = {
-            'time': datetime.now(),
-            'season': self._get_season(datetime.now()),
-            'location': None,
-            'atmosphere': None,
-            # 'current_activity': None,
-            # 'emotional_state': None
-            # [?] what else?
-        }
+        now = datetime.now()        # one clock reading for both
+        self.immediate_situation = ImmediateSituation(time=now, season=self._get_season(now))
 
     def _get_season(self, date):
         # simplified season calculation
         # might need a smoother transition between seasons
         # and/or more responsive ways to handle seasonal difference
         # between physical locations
-        month = date.month
-        day = date.day
-        if (month == 3 and day >= 20) or (month == 4) or (month == 5) or (month == 6 and day < 21):
-            return Season.SPRING
-        elif (month == 6 and day >= 21) or (month == 7) or (month == 8) or (month == 9 and day < 22):
-            return Season.SUMMER
-        elif (month == 9 and day >= 22) or (month == 10) or (month == 11) or (month == 12 and day < 21):
-            return Season.AUTUMN
-        else:
-            return Season.WINTER
+        return _season_for(date.month, date.day)
+
+# transitions are reported through a queue, drained on a background thread, so whatever ends up
+# listening (logging, telemetry) never holds up the state machine itself
+_telemetry_q: queue.SimpleQueue = queue.SimpleQueue()
+_telemetry_log = logging.getLogger(__name__)
+_telemetry_started = False
+_telemetry_lock = threading.Lock()
+
+def _drain_telemetry():
+    while True:
+        old_state, new_state, at = _telemetry_q.get()
+        _telemetry_log.debug("%s -> %s at %.3f", old_state.name, new_state.name, at)
+
+def _start_telemetry():
+    global _telemetry_started
+    with _telemetry_lock:
+        if not _telemetry_started:
+            threading.Thread(target=_drain_telemetry, name="query-fsm-telemetry", daemon=True).start()
+            _telemetry_started = True
 
 class QueryStateMachine:
     # are there alternatives to having this handled by a finite state machine
     # [?] perhaps something more ... cybernetic?
     def __init__(self):
-        self.current_state = QueryState.INITIAL
+        self.current_state = QueryState.GATHERING_CONTEXT
+        self.is_complete = False
         self.context_data = {}
         self.refinement_data = {}
         self.boundaries = {}
+        _start_telemetry()
 
     def transition_to(self, new_state: QueryState) -> bool:
-        # need to give much more thought to this state machine
-        # these stages need refinement and clarification
-        # [?] how do they interact?
-        valid_transitions = {
-            QueryState.INITIAL: [QueryState.GATHERING_CONTEXT],
-            QueryState.GATHERING_CONTEXT: [QueryState.REFINING],
-            QueryState.REFINING: [QueryState.SETTING_BOUNDARIES, QueryState.GATHERING_CONTEXT],
-            QueryState.SETTING_BOUNDARIES: [QueryState.SYNTHESISING, QueryState.REFINING],
-            QueryState.SYNTHESISING: [QueryState.COMPLETE, QueryState.REFINING],
-            QueryState.COMPLETE: [QueryState.INITIAL]                                           # allow starting over
-        }
-
-        if new_state in valid_transitions[self.current_state]:
+        old_state = self.current_state
+        if _TRANSITION_MASKS[old_state] & (1 << new_state):
             self.current_state = new_state
+            _telemetry_q.put_nowait((old_state, new_state, time.monotonic()))
+            return True
+        return False
+
+    def complete(self) -> bool:
+        """Finish the session; only once the query has been synthesised"""
+        if self.current_state is QueryState.SYNTHESISING:
+            self.is_complete = True
             return True
         return False
+
+    def start_over(self):
+        """Allow starting over, once complete"""
+        if self.is_complete:
+            self.current_state = QueryState.GATHERING_CONTEXT
+            self.is_complete = False
     
-    def get_current_prompts(self) -> List[str]:
+    def get_current_prompts(self) -> tuple[str, ...]:
         """Return appropriate prompts based on current state"""
-        if self.current_state == QueryState.GATHERING_CONTEXT:
-            return [
-                "Where are you right now?",
-                "What time of day is it?",
-                "How would you describe the atmosphere around you?"
-            ]
-        # add other state-specific prompts
-        return []
+        return _PROMPTS_BY_STATE.get(self.current_state, ())
+
+_FINAL_TEMPLATE = "Query based on:\nImmediate: {immediate}\nTemporal: {temporal}\nEnvironmental: {environmental}"
 
 class QueryFormulation:
     def __init__(self):
         self.state_machine = QueryStateMachine()
         self.context = Context()
-        self.gatherer = ContextGatherer()
+        self.gatherer = ContextGatherer(self.state_machine.context_data)
+        # one handler per state, looked up directly rather than down an if/elif ladder
+        self._handlers = {
+            QueryState.GATHERING_CONTEXT: self._handle_gathering,
+            QueryState.REFINING: self._handle_refining,
+            QueryState.SETTING_BOUNDARIES: self._handle_setting_boundaries,
+            QueryState.SYNTHESISING: self._handle_synthesising
+        }
 
     def begin_session(self) -> str:
-        while self.state_machine.current_state != QueryState.COMPLETE:
-            self._process_current_state()
+        # each step reports whether the session goes on, so the loop stops on the step that completes it
+        process = self._process_current_state
+        while process():
+            pass
         return self._generate_final_query()
     
-    def _process_current_state(self):
-        if self.state_machine.current_state == QueryState.INITIAL:
-            self.state_machine.transition_to(QueryState.GATHERING_CONTEXT)
-    
-        elif self.state_machine.current_state == QueryState.GATHERING_CONTEXT:
-            immediate = self.gatherer._gather_immediate()
-            temporal = self.gatherer._gather_temporal()
-            environmental = self.gatherer._gather_environmental()
-
-            self.state_machine.context_data.update({
-                'immediate': immediate,
-                'temporal': temporal,
-                'environmental': environmental
-            })
-            
-            self.state_machine.transition_to(QueryState.REFINING)
+    def _process_current_state(self) -> bool:
+        """Handle the current state; False once the session is complete"""
+        return self._handlers[self.state_machine.current_state]()
+
+    def _handle_gathering(self):
+        # these all read from the same terminal, so they have to take turns; when non-interactive sources
+        # turn up (sensors, weather, etc.), fetch those concurrently (a thread pool or asyncio.gather)
+        # and let them overlap with the questions here, rather than running these concurrently
+        # (the gatherer writes its answers straight into the state machine's context data)
+        gatherer = self.gatherer
+        gatherer._gather_immediate()
+        gatherer._gather_temporal()
+        gatherer._gather_environmental()
+        
+        self.state_machine.transition_to(QueryState.REFINING)
+        return True
 
-        elif self.state_machine.current_state == QueryState.REFINING:
-            # implement refinement logic
-            refined = self._refine_query()
-            if refined:
-                self.state_machine.transition_to(QueryState.SETTING_BOUNDARIES)
+    def _handle_refining(self):
+        # implement refinement logic
+        refined = self._refine_query()
+        if refined:
+            self.state_machine.transition_to(QueryState.SETTING_BOUNDARIES)
+        return True
+
+    def _handle_setting_boundaries(self):
+        # implement boundary-setting logic (see SituationBounding)
+        return True
+
+    def _handle_synthesising(self):
+        # implement synthesis logic
+        # (the one state the session can end from, via state_machine.complete())
+        return not self.state_machine.is_complete
 
     def _refine_query(self) -> bool:
         # implement refinement logic here
@@ -129,46 +220,46 @@ class QueryFormulation:
         pass
 
     def _generate_final_query(self) -> str:
-        context = self.state_machine.context_data
-        return f"Query based on:\nImmediate: {context['immediate']}\nTemporal: {context['temporal']}\nEnvironmental: {context['environmental']}"
+        return _FINAL_TEMPLATE.format_map(self.state_machine.context_data)
 
 class ContextGatherer:
-    def __init__(self):
-        self.immediate = {}
-        self.temporal = {}
-        self.environmental = {}
+    def __init__(self, target: Optional[Dict[str, Dict[str, str]]] = None):
+        # answers are written straight into the target (the state machine's context data, in a session),
+        # under 'immediate', 'temporal' and 'environmental', rather than collected here and copied over
+        self.target = target if target is not None else {}
+        # resolved once, rather than going through sys on every question
+        self._readline = sys.stdin.readline
+        self._write = sys.stdout.write
+        self._flush = sys.stdout.flush
 
-    def _gather_immediate(self) -> Dict:
-        # start with simple command-line prompts
-        responses = {}
-        questions = [
-            "Where are you right now?",
-            "What time of day is it?"
-        ]
-        
+    def _ask_each(self, key: str, questions: tuple[str, ...]) -> Dict[str, str]:
+        """Ask each question in turn, just before reading its answer (a line), recording the answers in
+        target[key]; EOFError if input runs out"""
+        # a plain write, flush and readline per question, rather than going through input() (which
+        # flushes stderr too)
+        write, flush, readline = self._write, self._flush, self._readline
+        # filled in as the answers come, rather than preallocated with dict.fromkeys(questions), so if input
+        # runs out nothing unanswered is left in it
+        responses = self.target[key] = {}
         for question in questions:
-            responses[question] = input(f"{question} ")
+            write(f"{question} ")
+            flush()
+            line = readline()
+            if not line:
+                # end of input: stop, rather than recording blanks for everything left unasked
+                raise EOFError(f"no answer to {question!r}")
+            responses[question] = line.rstrip("\n")
         return responses
+
+    def _gather_immediate(self) -> Dict:
+        # start with simple command-line prompts
+        return self._ask_each('immediate', _IMMEDIATE_QUESTIONS)
     
     def _gather_temporal(self) -> Dict:
-        responses = {}
-        questions = [
-            "Think about the past few days. What's been on your mind?",
-            "Looking ahead, what are you anticipating?"
-        ]
-        for question in questions:
-            responses[question] = input(f"{question} ")
-        return responses
+        return self._ask_each('temporal', _TEMPORAL_QUESTIONS)
 
     def _gather_environmental(self) -> Dict:
-        responses = {}
-        questions = [
-            "What's the energy like around you?",
-            "Are there any significant changes in your environment?"
-        ]
-        for question in questions:
-            responses[question] = input(f"{question} ")
-        return responses
+        return self._ask_each('environmental', _ENVIRONMENTAL_QUESTIONS)
         
     def _gather_responses(self, prompts: List[str]) -> Dict[str, str]:
         responses = {}
@@ -184,29 +275,54 @@ class QueryRefinement:
         # self.intuitive_track = RefinementTrack('intuitive')        # more free-form, intuitive refinement, associative prompts
         self.connections = []
         self.context = context
+        self._pool = ThreadPoolExecutor(max_workers=2)     # one worker per track
+
+    def close(self):
+        """Let go of the tracks' worker pool"""
+        self._pool.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     def refine_parallel(self):
     # a need for simultaneous but distinct prompt streams that can cross-pollinate
         """Run structured and intuitive refinement concurrently"""
+        submit = self._pool.submit
         while not self._refinement_complete():
-            structured_prompt = self.structured_track.next_prompt()
-            intuitive_prompt = self.intuitive_track.next_prompt()
+            # each track works out its next prompt (and later, digests its response) alongside the other
+            structured_future = submit(self.structured_track.next_prompt)
+            intuitive_future = submit(self.intuitive_track.next_prompt)
+            structured_prompt, intuitive_prompt = structured_future.result(), intuitive_future.result()
             
-            # alternate between tracks
+            # the querent still answers one track at a time
             structured_response = self._get_response(structured_prompt)
-            self._process_structured(structured_response)
-            
             intuitive_response = self._get_response(intuitive_prompt)
-            self._process_intuitive(intuitive_response)
+
+            structured_future = submit(self._process_structured, structured_response)
+            intuitive_future = submit(self._process_intuitive, intuitive_response)
+            structured_future.result()
+            intuitive_future.result()
             
             # look for connections
             # surface potential connections between tracks
             self._identify_connections()
 
     def process_parallel(self):
-        structured_result = self.structured_track.process()
-        intuitive_result = self.intuitive_track.process()
-        self.identify_connections(structured_result, intuitive_result)
+        # whichever track finishes first gets its connections in first, rather than waiting on the slower one
+        futures = {
+            self._pool.submit(self.structured_track.process): 'structured',
+            self._pool.submit(self.intuitive_track.process): 'intuitive'
+        }
+        for future in as_completed(futures):
+            self._partial_connections(futures[future], future.result())
+
+    def _partial_connections(self, track: str, result):
+        """Fold one track's result into the connections surfaced so far"""
+        # [?] what counts as a connection, when only one of the tracks may have reported back?
+        self.connections.append((track, result))
 
 # clear boundary-setting mechanisms that help focus without oversimplifying
 # dimension-reduction is crucial, for managing the signal-to-noise ratio
@@ -219,19 +335,25 @@ class SituationBounding:
     
     def reduce_dimensions(self, situation_data):
         """Progressive dimension reduction"""
+        # [?] once there's a real reduction here, and it turns out to be costly, memoise it on the situation
         # extract key dimensions from both tracks
         # identify key themes and relationships
         # reduce dimensions while preserving salient context & complexity
 
+        # the themes are settled once reduced; sealed, they hash (once, cached) and can be shared as they are
+        self.core_themes = frozenset(self.core_themes)
+
 def main():
     app = typer.Typer(help="Query formulation tool")
 
     @app.command()
     def formulate():
         formulation = QueryFormulation()
-        with typer.progressbar(length=100) as progress:
+        try:
             result = formulation.begin_session()
-            progress.update(100)
+        except EOFError:
+            typer.echo("\nInput ended before the context was gathered.")
+            raise typer.Exit(1)
         typer.echo(f"\nFormulated query:")
         typer.echo(f"----------------")
         print(result)
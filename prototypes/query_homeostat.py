@@ -1,11 +1,12 @@
 from dataclasses import dataclass, field
-from typing import Any, List, Optional, Callable, Dict, Tuple, Set
+from typing import Any, List, Optional, Callable, Dict, Tuple
 from collections import deque
 from datetime import datetime, timedelta
 import typer
 import random
 import re
-import statistics
+import itertools
+import math
 import time
 import uuid # unique identifiers
 from enum import Enum
@@ -37,6 +38,12 @@ class SystemState(Enum):
     DWELLING = "dwelling"        # staying with particular elements
     EMERGING = "emerging"        # moving toward query formation
 
+# position in declaration order, for indexing per-state tables directly
+_STATE_INDEX: Dict[SystemState, int] = {state: i for i, state in enumerate(SystemState)}
+
+# a small non-zero code per state, so states can be packed into the nibbles of an int (0 meaning "empty")
+_STATE_NIBBLE: Dict[SystemState, int] = {state: i + 1 for state, i in _STATE_INDEX.items()}
+
 # when the system reaches/stays within `EMERGING` state
 # for a number of interaction loops, it then activates the input module?
 
@@ -46,7 +53,7 @@ class DialogueRhythm:
     thinking_pause: float = 0.3     # micro-pause for "thinking"
     char_rate: float = 0.02         # seconds per character for gradual text display
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Variety:
 # modelling variety as a multidimensional construct, following the ideas of W. Ross Ashby
 # assumes linear scaling (0.0-1.0) is appropriate for these measures
@@ -56,12 +63,21 @@ class Variety:
     dispersal: float = 0.0    # degree of scatter or diffusion, looseness, spatial and conceptual spread
     intensity: float = 0.0    # emotional temperature, pressure, and energetic charge
     complexity: float = 0.0   # pattern richness and density, conceptual nesting
+    # overall variety, averaged across the three; worked out once, since most things only look at this
+    mean: float = field(init=False, repr=False, compare=False)
+    _hash: int = field(init=False, repr=False, compare=False)
 
     def __post_init__(self):  # [?] what is `__post_init__` doing here
         # validate ranges
         for field in [self.dispersal, self.intensity, self.complexity]:
             if not 0.0 <= field <= 1.0:
                 raise ValueError("Variety measures must be between 0.0 and 1.0")
+        # frozen, so set directly
+        object.__setattr__(self, "mean", (self.dispersal + self.intensity + self.complexity) / 3)
+        object.__setattr__(self, "_hash", hash((self.dispersal, self.intensity, self.complexity)))
+
+    def __hash__(self):
+        return self._hash
 
     def explain(self) -> str:
         # "EXPLAIN YOURSELF"
@@ -106,34 +122,59 @@ class SessionTrace:
     # a lightweight way to track the "shape" of interactions
     # while preserving privacy and a sense of transience
     # "brb gaffer-taping some lambdas to our deque"
-    variety_trajectory: List[Variety]
+    # the trajectory is kept as parallel streams of floats rather than a list of Variety objects,
+    # since the detectors only ever look at one measure at a time
+    dispersal_trajectory: List[float]
+    intensity_trajectory: List[float]
+    complexity_trajectory: List[float]
     state_transitions: List[Tuple[SystemState, float]]  # state and timestamp
     momentum_shifts: List[float]
     
     # [!] TODO need to faff about with calibrating these patterns
     def __init__(self, window_size: int = 5):
-        self.closure_window = deque(maxlen=window_size) # sliding window of interactions
+        self.window_size = window_size
+        self.dispersal_trajectory = []
+        self.intensity_trajectory = []
+        self.complexity_trajectory = []
+        self.state_transitions = []
+        self.momentum_shifts = []
+        # sliding window of interactions, one deque per measure
+        self.dispersal_window = deque(maxlen=window_size)
+        self.intensity_window = deque(maxlen=window_size)
+        self.complexity_window = deque(maxlen=window_size)
+        self.state_window = deque(maxlen=window_size)
+        self.timestamp_window = deque(maxlen=window_size)
         self.pattern_detectors = {
-            'intensity_shift': lambda v1, v2: abs(v1.intensity - v2.intensity) > 0.3,
-            'complexity_peak': lambda v: v.complexity > 0.7,
-            'settling_pattern': lambda vs: all(v.dispersal < 0.4 for v in vs[-3:])
+            'intensity_shift': lambda intensities: abs(intensities[-1] - intensities[-2]) > 0.3,
+            'complexity_peak': lambda complexities: complexities[-1] > 0.7,
+            'settling_pattern': lambda dispersals: all(
+                d < 0.4 for d in itertools.islice(dispersals, max(len(dispersals) - 3, 0), None))
+        }
+        # which window each detector reads
+        self._detector_windows = {
+            'intensity_shift': self.intensity_window,
+            'complexity_peak': self.complexity_window,
+            'settling_pattern': self.dispersal_window
         }
 
-    def capture_moment(self, variety: Variety, state: SystemState):
+    def capture_moment(self, variety: Variety, state: SystemState) -> Optional[str]:
         """Motion capture (after a fashion) for meaning-making."""
-        self.closure_window.append((variety, state, time.time()))
-
-        if len(self.variety_trajectory) > self.window_size:
-            recent_varieties = [v for v, _, _ in self.closure_window]
-            patterns = {
-                name: detector(recent_varieties) 
-                for name, detector in self.pattern_detectors.items()
-            }
-
+        self.dispersal_window.append(variety.dispersal)
+        self.intensity_window.append(variety.intensity)
+        self.complexity_window.append(variety.complexity)
+        self.state_window.append(state)
+        self.timestamp_window.append(time.time())
+        self.dispersal_trajectory.append(variety.dispersal)
+        self.intensity_trajectory.append(variety.intensity)
+        self.complexity_trajectory.append(variety.complexity)
+
+        if len(self.dispersal_trajectory) > self.window_size:
             # detect emergent phenomena
             # this implementation is _extremely shonky_, but
-            if patterns['settling pattern']:
+            # (only settling is acted on, so that's the only detector run)
+            if self.pattern_detectors['settling_pattern'](self._detector_windows['settling_pattern']):
                 return 'READY_FOR_QUERY'
+        return None
 
 @dataclass
 class InteractionMetrics:
@@ -144,50 +185,80 @@ class InteractionMetrics:
     dominant_state: SystemState
     response_pattern: str  # 'stable', 'oscillating', 'evolving'
 
+@dataclass(frozen=True, slots=True)
+class Fingerprint:
+    """Summary of a session's interaction history (see HistoryAnalyser.get_fingerprint)."""
+    duration: float
+    states: int
+    final_state: Optional[SystemState]
+    dominant_state: str
+    stability: float
+    pattern: str
+    trend: str      # 'increasing', 'decreasing'
+
+    def to_dict(self) -> Dict:
+        """As a plain dict, for logging; stability rounded to two places."""
+        return {
+            'duration': self.duration,
+            'states': self.states,
+            'final_state': self.final_state,
+            'dominant_state': self.dominant_state,
+            'stability': f"{self.stability:.2f}",
+            'pattern': self.pattern,
+            'trend': self.trend
+        }
+
 class HistoryAnalyser:
     """Analyses interaction history for patterns and insights."""
     
     def __init__(self, window_size: int = 5):
         self.window_size = window_size
-        self.variety_history: deque = deque(maxlen=window_size)
+        # only the overall variety is ever analysed, so that's all that's kept of each
+        self.mean_history: deque = deque(maxlen=window_size)
         self.state_history: deque = deque(maxlen=window_size)
         self.timestamp_history: deque = deque(maxlen=window_size)
+        self.start_time = time.time()
+        # the same states, packed 4 bits apiece into one int (newest lowest), for _is_oscillating
+        self._state_word = 0
+        self._state_word_mask = (1 << (4 * window_size)) - 1
     
     def add_interaction(self, variety: Variety, state: SystemState, 
                        timestamp: float):
         """Record a new interaction."""
-        self.variety_history.append(variety)
+        self.mean_history.append(variety.mean)
         self.state_history.append(state)
         self.timestamp_history.append(timestamp)
+        self._state_word = ((self._state_word << 4) | _STATE_NIBBLE[state]) & self._state_word_mask
 
     def analyse(self) -> Optional[InteractionMetrics]:
         """Analyse recorded history and return metrics."""
-        if len(self.variety_history) < 2:
+        if len(self.mean_history) < 2:
             return None
 
         # calculate basic metrics
-        variety_values = [
-            (v.dispersal + v.intensity + v.complexity) / 3 
-            for v in self.variety_history
-        ]
+        # (plain float reductions over a handful of values; if the window ever grows large enough for this
+        # to matter, these are the loops to hand to numba, over the means kept as a float array)
+        variety_values = self.mean_history
         
-        avg_variety = statistics.mean(variety_values)
+        avg_variety = math.fsum(variety_values) / len(variety_values)   # statistics.mean goes via Fractions
 
         # calculate variety trend
         variety_trend = variety_values[-1] - variety_values[0]
 
         # calculate state stability
+        states = self.state_history
         state_changes = sum(
-            1 for i in range(1, len(self.state_history))
-            if self.state_history[i] != self.state_history[i-1]
+            1 for previous, current in zip(states, itertools.islice(states, 1, None))
+            if current != previous
         )
         state_stability = 1.0 - (state_changes / (len(self.state_history) - 1))
 
-        # find dominant state
-        state_counts = {}
-        for state in self.state_history:
-            state_counts[state] = state_counts.get(state, 0) + 1
-        dominant_state = max(state_counts.items(), key=lambda x: x[1])[0]
+        # find dominant state: counts in a slot per state (by index); on a tie, the one seen first wins
+        state_counts = [0] * len(_STATES)
+        for state in states:
+            state_counts[_STATE_INDEX[state]] += 1
+        top_count = max(state_counts)
+        dominant_state = next(state for state in states if state_counts[_STATE_INDEX[state]] == top_count)
 
         # determine response pattern
         if state_stability > 0.8:
@@ -210,28 +281,30 @@ class HistoryAnalyser:
         if len(self.state_history) < 4:
             return False
 
-        # check for alternating patterns
-        states = list(self.state_history)
-        return any(
-            states[i] == states[i-2]
-            for i in range(2, len(states))
-        )
+        # check for alternating patterns: any state matching the one two before it
+        # XOR-ing the packed states against themselves shifted two places along zeroes the nibble
+        # wherever that happens; then the usual has-a-zero trick, over just the nibbles with a pair to compare
+        pairs = (1 << (4 * (len(self.state_history) - 2))) - 1
+        ones = pairs // 0xF                                     # 0x...111
+        w = self._state_word
+        x = (w ^ (w >> 8)) & pairs
+        return ((x - ones) & ~x & (ones << 3)) != 0
 
-    def get_fingerprint(self) -> Dict:
+    def get_fingerprint(self) -> Optional[Fingerprint]:
         """Generate a unique fingerprint for the current session."""
         metrics = self.analyse()
         if not metrics:
-            return {}
+            return None
         
-        return {
-            'duration': time.time() - self.start_time,
-            'states': len(self.state_history),
-            'final_state': self.state_history[-1][0] if self.state_history else None,
-            'dominant_state': metrics.dominant_state.value,
-            'stability': f"{metrics.state_stability:.2f}",
-            'pattern': metrics.response_pattern,
-            'trend': 'increasing' if metrics.variety_trend > 0 else 'decreasing'
-        }
+        return Fingerprint(
+            duration=time.time() - self.start_time,
+            states=len(self.state_history),
+            final_state=self.state_history[-1] if self.state_history else None,
+            dominant_state=metrics.dominant_state.value,
+            stability=metrics.state_stability,
+            pattern=metrics.response_pattern,
+            trend='increasing' if metrics.variety_trend > 0 else 'decreasing'
+        )
 
 @dataclass
 class TransitionTrace:
@@ -245,7 +318,7 @@ class TransitionTrace:
         """Generate transition signature."""
         return f"{self.from_state.value}→{self.to_state.value}:{hash(self.variety_snapshot)}"
 
-@dataclass
+@dataclass(slots=True)
 class Environment:
     """Current conditions of the meaning-making space."""
     state: SystemState = field(default=SystemState.SETTLING)
@@ -256,16 +329,17 @@ class Environment:
     pause_level: int = 1                                # current temporal pacing (1-5)
     depth_level: int = 1                                # current depth of engagement (1-5)
 
-    # minimal state tracking
-    history: deque = field(default_factory=lambda: deque(maxlen=5))
+    # minimal state tracking; recent varieties, as three parallel streams of floats
+    dispersal_history: deque = field(default_factory=lambda: deque(maxlen=5))
+    intensity_history: deque = field(default_factory=lambda: deque(maxlen=5))
+    complexity_history: deque = field(default_factory=lambda: deque(maxlen=5))
     momentum: float = 0.0                               # track rate of change in variety
     persistence: int = 0                                # track duration in current state
 
     def update(self, variety: Variety, new_state: SystemState) -> None:
         """Record new state and update environment measures."""
         # update momentum based on variety change
-        prev_variety = self.history[-1] if self.history else variety
-        self.momentum = self._calculate_momentum(variety, prev_variety)
+        self.momentum = self._calculate_momentum(variety)
         
         # update persistence
         # [?] which is, what, a counter?
@@ -275,18 +349,26 @@ class Environment:
             self.persistence = 0
             
         # update core state
-        self.history.append(variety)        # store entire variety object
+        self.record(variety)
         self.state = new_state
         self._adjust_levels(variety)
 
-    def _calculate_momentum(self, current: Variety, previous: Variety) -> float:
-        """Calculate the rate of change in overall variety."""
-        if not isinstance(current, Variety) or not isinstance(previous, Variety):
+    def record(self, variety: Variety) -> None:
+        """Add a variety's measures to the history."""
+        self.dispersal_history.append(variety.dispersal)
+        self.intensity_history.append(variety.intensity)
+        self.complexity_history.append(variety.complexity)
+
+    def _calculate_momentum(self, current: Variety) -> float:
+        """Calculate the rate of change in overall variety, against the latest in the history."""
+        if not isinstance(current, Variety):
             return 0.0 # return default value if types are incorrect
+        if not self.dispersal_history:
+            return 0.0
 
-        current_val = (current.dispersal + current.intensity + current.complexity) / 3.0
-        prev_val = (previous.dispersal + previous.intensity + previous.complexity) / 3.0
-        return current_val - prev_val
+        previous_mean = (self.dispersal_history[-1] + self.intensity_history[-1]
+                         + self.complexity_history[-1]) / 3
+        return current.mean - previous_mean
 
     def _adjust_levels(self, variety: Variety) -> None:
         """Adjust environment levels based on variety measures."""
@@ -307,63 +389,60 @@ class StateTransition:
     condition: Callable[[Variety], bool]
     on_transition: Optional[Callable[[], None]] = None
 
+_STATES: Tuple[SystemState, ...] = tuple(SystemState)       # by index
+
+_INF = math.inf
+
+def _clamp01(x: float) -> float:
+    """x, clamped to [0.0, 1.0]"""
+    # chained comparisons rather than min/max, which cost two builtin calls on every assessment
+    return 0.0 if x < 0.0 else (1.0 if x > 1.0 else x)
+
+# the default transitions, as thresholds: each row holds when every measure lies strictly inside its bounds
+# and persistence is above its floor; an "or" takes a row per alternative. A state's rows are tried in
+# order (the safety rows, back to SETTLING, last), and the first to hold wins
+_DEFAULT_TRANSITIONS: Tuple[Tuple[SystemState, SystemState, float, float, float, float, float, float, int], ...] = (
+    # from                  to                      dispersal      intensity      complexity     persistence
+    (SystemState.SETTLING,   SystemState.EXPANDING,  -_INF, 0.3,    -_INF, _INF,   -_INF, _INF,   2),
+    (SystemState.EXPANDING,  SystemState.CONTAINING, 0.7, _INF,     -_INF, _INF,   -_INF, _INF,   -1),
+    (SystemState.EXPANDING,  SystemState.CONTAINING, -_INF, _INF,   0.7, _INF,     -_INF, _INF,   -1),
+    (SystemState.CONTAINING, SystemState.DWELLING,   -_INF, _INF,   -_INF, 0.5,    0.4, _INF,     -1),
+    (SystemState.DWELLING,   SystemState.EMERGING,   -_INF, _INF,   -_INF, _INF,   0.6, _INF,     2),
+) + tuple(
+    row
+    for state in SystemState if state != SystemState.SETTLING
+    for row in ((state, SystemState.SETTLING,        -_INF, _INF,   0.9, _INF,     -_INF, _INF,   -1),
+                (state, SystemState.SETTLING,        0.9, _INF,     -_INF, _INF,   -_INF, _INF,   -1))
+)
+
+def _threshold_condition(d_lo: float, d_hi: float, i_lo: float, i_hi: float, c_lo: float, c_hi: float,
+                         p_above: int) -> Callable[[Variety, "Environment"], bool]:
+    """A StateTransition condition for one row of thresholds."""
+    return lambda v, env: (d_lo < v.dispersal < d_hi and i_lo < v.intensity < i_hi
+                           and c_lo < v.complexity < c_hi and env.persistence > p_above)
+
 class StateMachine:
     """Manages system state transitions and validation."""
     
     def __init__(self):
-        self._transitions: Dict[SystemState, Set[StateTransition]] = {
-            state: set() for state in SystemState
-        }
+        # per state (by index), its transitions in the order they were added, which is also their priority
+        self._transitions: List[List[StateTransition]] = [[] for _ in SystemState]
         self._setup_transitions()
 
     def _setup_transitions(self):
         """Define valid state transitions and their conditions."""
-
-        # from SETTLING
-        self.add_transition(StateTransition(
-            SystemState.SETTLING,
-            SystemState.EXPANDING,
-            lambda v, env: v.dispersal < 0.3 and env.persistence > 2
-        ))
-
-        # from EXPANDING
-        self.add_transition(StateTransition(
-            SystemState.EXPANDING,
-            SystemState.CONTAINING,
-            lambda v, env: v.dispersal > 0.7 or v.intensity > 0.7
-        ))
-        
-        # from CONTAINING
-        self.add_transition(StateTransition(
-            SystemState.CONTAINING,
-            SystemState.DWELLING,
-            lambda v, env: v.intensity < 0.5 and v.complexity > 0.4
-        ))
-
-        # from DWELLING
-        self.add_transition(StateTransition(
-            SystemState.DWELLING,
-            SystemState.EMERGING,
-            lambda v, env: v.complexity > 0.6 and env.persistence > 2
-        ))
-
-        # safety transitions back to SETTLING
-        for state in SystemState:
-            if state != SystemState.SETTLING:
-                self.add_transition(StateTransition(
-                    state,
-                    SystemState.SETTLING,
-                    lambda v, env: v.intensity > 0.9 or v.dispersal > 0.9
-                ))
+        # (see _DEFAULT_TRANSITIONS for the thresholds themselves)
+        for from_state, to_state, *bounds in _DEFAULT_TRANSITIONS:
+            self.add_transition(StateTransition(from_state, to_state, _threshold_condition(*bounds)))
 
     def add_transition(self, transition: StateTransition):
         """Add a valid state transition."""
-        self._transitions[transition.from_state].add(transition)
+        self._transitions[_STATE_INDEX[transition.from_state]].append(transition)
 
     def get_next_state(self, current_state: SystemState, 
                        variety: Variety, env: Environment) -> SystemState:
         """Determine the next valid state based on current conditions."""
-        valid_transitions = self._transitions[current_state]
+        valid_transitions = self._transitions[_STATE_INDEX[current_state]]
 
         for transition in valid_transitions:
             if transition.condition(variety, env):
@@ -377,37 +456,67 @@ class StateMachine:
                           to_state: SystemState) -> bool:
         """Check if a state transition is valid."""
         return any(t.to_state == to_state 
-                  for t in self._transitions[from_state])
+                  for t in self._transitions[_STATE_INDEX[from_state]])
 
 @dataclass
 class SimplePatternTrace:
     """Lightweight trace of interaction patterns."""
     window_size: int = 3
-    variety_window: deque = field(default_factory=lambda: deque(maxlen=3))
+    # only the overall variety is ever looked at, so that's all that's kept
+    mean_window: deque = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.mean_window = deque(maxlen=self.window_size)
     
     def detect_basic_pattern(self, variety: Variety) -> Optional[str]:
         """Detect fundamental patterns without complex calculations."""
-        self.variety_window.append(variety)
-        if len(self.variety_window) < self.window_size:
+        window = self.mean_window
+        window.append(variety.mean)
+        if len(window) < self.window_size:
             return None
             
         # simple convergence check
-        latest_values = [sum([v.dispersal, v.intensity, v.complexity])/3 
-                        for v in self.variety_window]
-        if all(abs(latest_values[i] - latest_values[i-1]) < 0.1 
-               for i in range(1, len(latest_values))):
+        if all(abs(current - previous) < 0.1 
+               for previous, current in zip(window, itertools.islice(window, 1, None))):
             return "settling"
         return None
 
+# QueryHomeostat.regulate_variety's rules, in priority order, each a test of (variety, momentum, persistence)
+# and the state it picks; the first to hold wins, and if none does, the state is EMERGING
+_REGULATION_RULES: Tuple[Tuple[Callable[[Variety, float, int], bool], SystemState], ...] = (
+    (lambda v, momentum, persistence: v.mean > 0.8, SystemState.CONTAINING),       # overall variety
+    (lambda v, momentum, persistence: v.dispersal > 0.7, SystemState.DWELLING),
+    (lambda v, momentum, persistence: v.complexity > 0.7, SystemState.CONTAINING),
+    (lambda v, momentum, persistence: persistence > 3 and momentum < 0.1, SystemState.EXPANDING),
+    (lambda v, momentum, persistence: v.complexity < 0.2, SystemState.SETTLING),
+)
+
+# how many inputs' varieties QueryHomeostat keeps, for re-submitted (retried, edited-back) input
+_VARIETY_CACHE_SIZE = 256
+
+# the fixed patterns QueryHomeostat's assessments use, compiled once for every instance
+# (the marker libraries, which are meant to be tuned, stay on the instance)
+_SENTENCE_SPLIT_RE = re.compile(r'[.!?]+')
+_BREAK_RE = re.compile(r'\n|(?<=[.!?])\s+(?=[A-Z])')                # line breaks and new sentences
+_TENSE_PHRASE_RE = re.compile(r'\b(?:going|used) to\b')             # the two-word tense shifts
+_WORD_RE = re.compile(r'\w+')
+
 class QueryHomeostat:
     """A homeostat for maintaining conditions conducive to query formation."""
+    # (everything it holds is set up in __init__; slots keep the lookups on the per-turn path direct)
+    __slots__ = (
+        'environment',
+        'pause_patterns', 'containing_patterns', 'depth_patterns', 'expansion_prompts', 'emergence_prompts',
+        'hot_markers', 'hot_words', 'cool_markers', 'cool_words', '_flow_chars', 'embodied_words',
+        'connection_words', 'movement_words', 'shift_words', 'abstraction_words', 'recursion_words',
+        '_category_ids', '_word_categories', '_variety_cache', '_response_dispatch'
+    )
     
     def __init__(self):
         self.environment = Environment(
             state=SystemState.SETTLING,
             variety=Variety(),
             last_response="",
-            history=deque(maxlen=5), # keeping only recent history
             momentum = 0.0,
             persistence = 0
         )
@@ -456,20 +565,85 @@ class QueryHomeostat:
             "What query emerges from this exploration?"
         ]
 
+        # markers are matched against lowercased text (so, e.g., 'all_caps' and 'I' never match);
+        # the punctuation/typographic ones are compiled patterns, the rest are lists of whole words,
+        # counted together in a single pass over the text's words (see _count_words)
         self.hot_markers = {
-            'exclamations': r'!+|\?!',
-            'all_caps': r'\b[A-Z]{2,}\b',  # captures any word of 2+ capital letters
-            'intensifiers': r'\b(very|really|absolutely|completely|totally)\b',
-            'emphasis': r'\*\*|__|!!+|\?{2,}',
-            'urgency': r'\b(now|immediately|suddenly|always|never|must|need)\b'
+            'exclamations': re.compile(r'!+|\?!'),
+            'all_caps': re.compile(r'\b[A-Z]{2,}\b'),  # captures any word of 2+ capital letters
+            'emphasis': re.compile(r'\*\*|__|!!+|\?{2,}')
+        }
+        self.hot_words = {
+            'intensifiers': ('very', 'really', 'absolutely', 'completely', 'totally'),
+            'urgency': ('now', 'immediately', 'suddenly', 'always', 'never', 'must', 'need')
         }
 
         self.cool_markers = {
-            'qualification': r'\b(perhaps|maybe|might|could|somewhat|sometimes|slowly)\b',
-            'distance': r'\b(observe|notice|sense|reflect)\b',
-            'modulation': r'[;:]|\.{2,}|—'
+            'modulation': re.compile(r'[;:]|\.{2,}|—')
+        }
+        self.cool_words = {
+            'qualification': ('perhaps', 'maybe', 'might', 'could', 'somewhat', 'sometimes', 'slowly'),
+            'distance': ('observe', 'notice', 'sense', 'reflect')
         }
 
+        # dispersal
+        # pauses [,;:] and interruptions [-()] are single characters, so they're counted with str.count
+        # (as are the trailing .../—); none of them overlap, so it comes to the same as matching them
+        self._flow_chars = ',;:-()'
+
+        # intensity
+        self.embodied_words = {
+            'somatic': ('feel', 'felt', 'body', 'heart', 'breath', 'hands', 'chest', 'stomach', 'gut', 'throat'),
+            'personal': ('I', 'me', 'my', 'mine'),
+            'experiential': ('sense', 'experience', 'perceive', 'aware')
+        }
+
+        # complexity
+        self.connection_words = {
+            'comparison': ('like', 'than', 'compare', 'compared', 'contrast', 'contrasted', 'similar', 'different'),
+            'relation': ('between', 'across', 'among', 'through', 'within'),
+            'causation': ('because', 'therefore', 'since', 'so'),
+            'constrast': ('but', 'however', 'although', 'though', 'yet'),
+        }
+        self.movement_words = {
+            'scale': ('part', 'whole', 'specific', 'general'),
+            'time': ('now', 'then', 'before', 'after', 'while', 'during'),
+            'space': ('here', 'there', 'between', 'across')
+        }
+        self.shift_words = {
+            'tense_shifts': ('had', 'have', 'will', 'shall', 'would', 'could', 'might'),
+            'viewpoint_shifts': ('I', 'we', 'one', 'they', 'he', 'she', 'everyone', 'anyone')
+        }
+        self.abstraction_words = {
+            'concepts': ('idea', 'theory', 'question', 'meaning', 'system', 'process', 'truth', 'principle'),
+            'qualities': ('nature', 'essence', 'character', 'aspect', 'form'),
+            'processes': ('becoming', 'changing', 'emerging', 'developing', 'flux'),
+            'systems': ('pattern', 'structure', 'relation', 'relationship', 'dynamic')
+        }
+        self.recursion_words = {
+            'direct': ('this', 'that', 'these', 'those'),
+            'self': ('itself', 'own', 'self'),
+            'meta': ('think', 'consider', 'understand', 'question'),
+            'nested': ('within', 'inside', 'containing', 'embedded'),
+            'recurring': ('again', 'back', 'return', 'cycle', 'recur', 'echo')
+        }
+
+        self._reindex_markers()
+
+        # assessed varieties by input text, least recently used first (see assess_variety);
+        # they only depend on the text and the marker libraries above, so if those change, call
+        # clear_variety_cache (which reindexes the libraries as well)
+        self._variety_cache: Dict[str, Variety] = {}
+
+        # the reply for each state, indexed by _STATE_INDEX (see _get_state_response)
+        self._response_dispatch: Tuple[Callable[[str], str], ...] = (
+            self._settling_reply,
+            self._expanding_reply,
+            self._containing_reply,
+            self._dwelling_reply,
+            self._emerging_reply
+        )
+
     def validate_input(self, input_text: str) -> bool:
         """Validate input before processing."""
         if not input_text or not isinstance(input_text, str):
@@ -482,20 +656,9 @@ class QueryHomeostat:
         """Apply spatial/depth pattern to response."""
         return self.depth_patterns[self.environment.depth_level - 1].format(text)
 
-    def _get_state_response(self, input_text: str, state: SystemState) -> str:
-        """State response generation."""
-        response_map = {
-            SystemState.SETTLING: lambda: self.settling_response(),
-            SystemState.EXPANDING: lambda: self.expanding_response(),
-            SystemState.CONTAINING: lambda: self.containing_response(input_text),
-            SystemState.DWELLING: lambda: self.dwelling_response(input_text),
-            SystemState.EMERGING: lambda: self.emerging_response()
-        }
-        return response_map.get(state, lambda: self.settling_response())()
-
     def containing_response(self, input_text: str) -> str:
         """Generate containing response for high variety."""
-        words = input_text.split()
+        words = input_text.split(None, 5)     # the first five words, and the rest (if any) unsplit
         key_phrase = " ".join(words[:5]) + "..." if len(words) > 5 else input_text
         response = self.containing_patterns[self.environment.depth_level - 1].format(key_phrase)
         return self.apply_timing(response)
@@ -552,22 +715,65 @@ class QueryHomeostat:
         except Exception as e:
             raise HomeostatError(f"Response generation failed: {str(e)}")
 
+    def clear_variety_cache(self) -> None:
+        """Forget previously assessed inputs, and reindex the marker libraries (call this after changing any
+        of them)."""
+        self._reindex_markers()
+        self._variety_cache.clear()
+
+    def _reindex_markers(self) -> None:
+        """(Re)build the word index over the marker word libraries."""
+        # every word, and the categories it counts towards (some count towards more than one); with the
+        # markers all whole words, a dict lookup per token does what a multi-pattern automaton would,
+        # in the same single pass, and without the boundary checks. Categories are numbered (see
+        # _category_ids), so they can be tallied in a plain list
+        self._category_ids: Dict[str, int] = {}
+        self._word_categories: Dict[str, Tuple[int, ...]] = {}
+        for words_by_category in (self.hot_words, self.cool_words, self.embodied_words, self.connection_words,
+                                  self.movement_words, self.shift_words, self.abstraction_words, self.recursion_words):
+            for category, words in words_by_category.items():
+                category_id = self._category_ids[category] = len(self._category_ids)
+                for word in words:
+                    self._word_categories[word] = self._word_categories.get(word, ()) + (category_id,)
+
     def assess_variety(self, input_text: str) -> Variety:
         """Assess the variety of user input and return a populated Variety object."""
+        cache = self._variety_cache
+        variety = cache.pop(input_text, None)
+        if variety is None:
+            variety = self._assess_variety(input_text)
+            if len(cache) >= _VARIETY_CACHE_SIZE:
+                del cache[next(iter(cache))]
+        cache[input_text] = variety     # (re)inserted last, as the most recently used
+        return variety
+
+    def _assess_variety(self, input_text: str) -> Variety:
+        """Assess input afresh (assess_variety keeps the results)."""
+        # markers are matched against lowercased text: lower it once, and count the marker words once,
+        # for both intensity and complexity
+        lower = input_text.lower()
+        words = self._count_words(lower)
+        tokens = lower.split()      # (splits the same as the original; lowercasing doesn't touch whitespace)
+        sentences = self._segment(lower)
 
         # dispersal: analyse rhythmic patterns and pacing
-        dispersal = self._assess_dispersal(input_text)
+        dispersal = self._assess_dispersal(input_text, sentences)
 
         # intensity: sense the "temperature" and emotional tone
-        intensity = self._assess_intensity(input_text)
+        intensity = self._assess_intensity(input_text, lower, tokens, sentences, words)
         
         # complexity: detect conceptual density and interrelatedness
-        complexity = self._assess_complexity(input_text)
+        complexity = self._assess_complexity(input_text, lower, tokens, words)
         
         return Variety(dispersal, intensity, complexity)
     
-    def _assess_dispersal(self, text: str) -> float:
-        """Analyse rhythms and pacing to assess dispersal."""
+    def _segment(self, text: str) -> List[str]:
+        """Split text into its (stripped, non-empty) sentences."""
+        return [stripped for s in _SENTENCE_SPLIT_RE.split(text) if (stripped := s.strip())]
+
+    def _assess_dispersal(self, text: str, sentences: List[str]) -> float:
+        """Analyse rhythms and pacing to assess dispersal; `sentences` is text's _segment (lowercased
+        or not, it's only their lengths in words that count)."""
         # core focus: rythmic scattering
         # how attention and expression are spread across the interaction space
         # more about pattern than content; fluctuations in the flow of language
@@ -577,9 +783,6 @@ class QueryHomeostat:
         metrics = {}
     
         # 1. basic structural/rhythm measures
-        sentences = re.split(r'[.!?]+', text)
-        sentences = [s.strip() for s in sentences if s.strip()]
-    
         if not sentences:
             return 0.0
         
@@ -591,16 +794,13 @@ class QueryHomeostat:
                 len(lengths) * avg_length)
         
         # 3. flow disruptions
-        flow_patterns = {
-            'pauses': r'[,;:]',
-            'interruptions': r'[\-\(\)]',
-            'trailing': r'\.\.\.|—'
-        }
-        disruption_markers = sum(len(re.findall(pattern, text)) 
-                                 for pattern in flow_patterns.values()) / len(text)
+        char_len = len(text)
+        disruption_markers = (
+            sum(map(text.count, self._flow_chars)) + text.count('...') + text.count('—')
+        ) / char_len
 
         # 4. syntactic/structural breaks
-        breaks = len(re.findall(r'\n|(?<=[.!?])\s+(?=[A-Z])', text)) / len(text)
+        breaks = len(_BREAK_RE.findall(text)) / char_len
 
         # combined weighting prioritising rhythm and flow; return a normalised dispersal value between 0 and 1
         dispersal = (
@@ -609,29 +809,42 @@ class QueryHomeostat:
             0.2 * breaks                            # tertiary structure measure
         )
     
-        return min(max(dispersal * 2.0, 0.0), 1.0)
-
-    def _detect_intensity_shift(self, sent1: str, sent2: str) -> bool:
-        """Detect significant shifts in intensity between sentences."""
-        # a function for intensity assessment
+        return _clamp01(dispersal * 2.0)
+
+    def _count_words(self, lower: str) -> List[int]:
+        """Count the marker categories in (lowercased) text, in one pass over its words; the counts
+        are by category number (see _category_ids)."""
+        # input is capped at 1000 characters (validate_input), which this handles in microseconds; if whole
+        # transcripts ever get assessed, this is the scan to hand to a multi-pattern engine (e.g. Hyperscan)
+        counts = [0] * len(self._category_ids)
+        categories_of = self._word_categories.get
+        for word in _WORD_RE.findall(lower):
+            category_ids = categories_of(word)
+            if category_ids is not None:        # most words aren't markers; skip them on the one lookup
+                for category_id in category_ids:
+                    counts[category_id] += 1
+        return counts
+
+    def _intensity_balance(self, lower: str) -> int:
+        """How many kinds of hot marker a (lowercased) sentence has, less how many kinds of cool one."""
         # [?] are 'hot_markers' and 'cool_markers' undefined attributes?
-        def get_intensity_markers(text:str) -> dict:
-            return {
-                'hot': sum(1 for pattern in self.hot_markers.values() 
-                          if re.search(pattern, text.lower())),
-                'cool': sum(1 for pattern in self.cool_markers.values() 
-                          if re.search(pattern, text.lower()))
-            }
-        
-        m1 = get_intensity_markers(sent1)
-        m2 = get_intensity_markers(sent2)
+        words = self._count_words(lower)
+        ids = self._category_ids
+        hot = (sum(1 for pattern in self.hot_markers.values() if pattern.search(lower)) +
+               sum(1 for category in self.hot_words if words[ids[category]]))
+        cool = (sum(1 for pattern in self.cool_markers.values() if pattern.search(lower)) +
+                sum(1 for category in self.cool_words if words[ids[category]]))
+        return hot - cool
 
+    def _detect_intensity_shift(self, sent1: str, sent2: str) -> bool:
+        """Detect significant shifts in intensity between (lowercased) sentences."""
         # compare intensity profiles
-        return abs((m1['hot'] - m1['cool']) - 
-                    (m2['hot'] - m2['cool'])) > 1
+        return abs(self._intensity_balance(sent1) - self._intensity_balance(sent2)) > 1
 
-    def _assess_intensity(self, text: str) -> float:
-        """Sense the "temperature" and emotional tone to assess intensity."""
+    def _assess_intensity(self, text: str, lower: str, tokens: List[str], sentences: List[str],
+                          words: List[int]) -> float:
+        """Sense the "temperature" and emotional tone to assess intensity; `lower` is text lowercased,
+        `tokens` its split, `sentences` its _segment and `words` its _count_words."""
         # core focus: energetic "charge", embodied experience
         # the force or pressure behind expression
         # shifts in emotion, tone, or energy
@@ -641,43 +854,37 @@ class QueryHomeostat:
             return 0.0
 
         metrics = {}
-        text_len = max(len(text.split()), 1) # avoid division by zero
+        text_len = max(len(tokens), 1) # avoid division by zero
+        ids = self._category_ids
 
         # calculate hot markers count, with higher weighting
-        hot_count = sum(len(re.findall(pattern, text.lower())) * 2
-                        for pattern in self.hot_markers.values())
+        hot_count = (sum(len(pattern.findall(lower)) for pattern in self.hot_markers.values()) +
+                     sum(words[ids[category]] for category in self.hot_words)) * 2
 
         # calculate cool markers count
-        cool_count = sum(len(re.findall(pattern, text.lower()))
-                         for pattern in self.cool_markers.values())
+        cool_count = (sum(len(pattern.findall(lower)) for pattern in self.cool_markers.values()) +
+                      sum(words[ids[category]] for category in self.cool_words))
         
         # convert counts to normalised intensity score
         metrics['pressure'] = float(hot_count + cool_count) / text_len
 
         # 1. embodied references
-        embodied_patterns = {
-            'somatic': r'\b(feel|felt|body|heart|breath|hands|chest|stomach|gut|throat)\b',
-            'personal': r'\b(I|me|my|mine)\b',
-            'experiential': r'\b(sense|experience|perceive|aware)\b'
-        }
         metrics['embodied'] = sum(
-            len(re.findall(pattern, text.lower()))
-            for pattern in embodied_patterns.values()
+            words[ids[category]]
+            for category in self.embodied_words
         ) / text_len
 
         # 2. repetition patterns
-        words = text.lower().split()
-        repetitions = len([w for i, w in enumerate(words) 
-                          if i > 0 and w == words[i-1]])
+        repetitions = sum(1 for previous, current in zip(tokens, itertools.islice(tokens, 1, None))
+                          if current == previous)
         metrics['repetition'] = repetitions / text_len
 
-        # 3. cross-sentence intensity shifts
-        sentences = re.split(r'[.!?]+', text)
-        sentences = [s.strip() for s in sentences if s.strip()]
+        # 3. cross-sentence intensity shifts (between the lowercased sentences, since that's what's compared)
+        # (each sentence's profile is worked out once, rather than once for each neighbour it's compared with)
         if len(sentences) > 1:
-            shift_intensity = sum(1 for i in range(len(sentences)-1)
-                                  if self._detect_intensity_shift(sentences[i],
-                                                                  sentences[i+1]))
+            balances = [self._intensity_balance(sentence) for sentence in sentences]
+            shift_intensity = sum(1 for previous, current in zip(balances, itertools.islice(balances, 1, None))
+                                  if abs(previous - current) > 1)
             metrics['shifts'] = shift_intensity / (len(sentences) - 1)
         else:
             metrics['shifts'] = 0.0
@@ -690,10 +897,11 @@ class QueryHomeostat:
             0.15 * metrics['repetition']    # pattern emphasis
         )
 
-        return min(max(intensity * 2.5, 0.0), 1.0)
+        return _clamp01(intensity * 2.5)
 
-    def _assess_complexity(self, text: str) -> float:
-        """Gague conceptual density and interrelatedness to assess complexity."""
+    def _assess_complexity(self, text: str, lower: str, tokens: List[str], words: List[int]) -> float:
+        """Gague conceptual density and interrelatedness to assess complexity; `lower` is text lowercased,
+        `tokens` its split and `words` its _count_words."""
         # core focus: conceptual density, cognitive mapping
         # how ideas nest and relate to each other
         # revealed through patterns of conceptual and temporal connection
@@ -702,117 +910,79 @@ class QueryHomeostat:
             return 0.0
         
         metrics = {}
-        text_len = max(len(text.split()), 1)  # avoid division by zero
+        text_len = max(len(tokens), 1)  # avoid division by zero
+        ids = self._category_ids
 
-        # 1. connection patterns
-        connection_types = {
-            'comparison': r'\b(like|than|compare|compared|contrast|contrasted|similar|different)\b',
-            'relation': r'\b(between|across|among|through|within)\b',
-            'causation': r'\b(because|therefore|since|so)\b',
-            'constrast': r'\b(but|however|although|though|yet)\b',
-        }
+        # (only each group's total is weighed, so that's all that's worked out)
+        def total(words_by_category: Dict[str, Tuple[str, ...]]) -> int:
+            return sum(words[ids[category]] for category in words_by_category)
 
-        metrics['connections'] = sum(
-            len(re.findall(pattern, text.lower()))
-            for pattern in connection_types.values()
-        ) / text_len
+        # 1. connection patterns
+        metrics['connections'] = total(self.connection_words) / text_len
 
         # 2. conceptual movement
-        movement_patterns = {
-            'scale': len(re.findall(r'\b(part|whole|specific|general)\b', text.lower())),
-            'time': len(re.findall(r'\b(now|then|before|after|while|during)\b', text.lower())),
-            'space': len(re.findall(r'\b(here|there|between|across)\b', text.lower()))
-        }
-
-        movement_score = sum(movement_patterns.values())
+        movement_score = total(self.movement_words)
 
-        # 3. perspectival shifts
-        metrics['shifts'] = {
-            'tense_shifts': len(re.findall(r'\b(had|have|will|shall|would|could|might|going to|used to)\b', text.lower())),
-            'viewpoint_shifts': len(re.findall(r'\b(I|we|one|they|he|she|everyone|anyone)\b', text.lower()))
-        }
+        # 3. perspectival shifts (the tense shifts include the two-word ones)
+        metrics['shifts'] = total(self.shift_words) + len(_TENSE_PHRASE_RE.findall(lower))
 
         # 4. abstract language
-        abstraction_patterns = {
-            'concepts': r'\b(idea|theory|question|meaning|system|process|truth|principle)\b',
-            'qualities': r'\b(nature|essence|character|aspect|form)\b',
-            'processes': r'\b(becoming|changing|emerging|developing|flux)\b',
-            'systems': r'\b(pattern|structure|relation|relationship|dynamic)\b'
-        }
-
-        metrics['abstraction'] = sum(
-            len(re.findall(pattern, text.lower()))
-            for pattern in abstraction_patterns.values()
-        ) / text_len
+        metrics['abstraction'] = total(self.abstraction_words) / text_len
 
         # 5. recursion/self-reference
-        metrics['recursion'] = {
-            'direct': len(re.findall(r'\b(this|that|these|those)\b', text.lower())),
-            'self': len(re.findall(r'\b(itself|own|self)\b', text.lower())),
-            'meta': len(re.findall(r'\b(think|consider|understand|question)\b', text.lower())),
-            'nested': len(re.findall(r'\b(within|inside|containing|embedded)\b', text.lower())),
-            'recurring': len(re.findall(r'\b(again|back|return|cycle|recur|echo)\b', text.lower()))
-        }
+        metrics['recursion'] = total(self.recursion_words)
+
+        # combined weighting; return a normalised complexity value between 0 and 1
+        # (plain arithmetic over counts, with text_len at least 1, so nothing here to catch)
+        complexity = (
+            0.30 * metrics['connections'] +                         # primary relational structure
+            0.25 * metrics['shifts'] / text_len +                   # perspective shifts
+            0.25 * metrics['abstraction'] +                         # abstractions and concepts
+            0.10 * movement_score +                                 # conceptual movement across scales
+            0.10 * metrics['recursion'] / text_len                  # self-reference
+        )
 
-        try:
-            # combined weighting; return a normalised complexity value between 0 and 1
-            complexity = (
-                0.30 * metrics['connections'] +                         # primary relational structure
-                0.25 * sum(metrics['shifts'].values()) / text_len +     # perspective shifts
-                0.25 * metrics['abstraction'] +                         # abstractions and concepts
-                0.10 * movement_score +                                 # conceptual movement across scales
-                0.10 * sum(metrics['recursion'].values()) / text_len    # self-reference
-            )
-
-            return min(max(complexity * 2.5, 0.0), 1.0)
-        except Exception as e:
-            raise VarietyAssessmentError(f"Error calculating complexity: {str(e)}")
+        return _clamp01(complexity * 2.5)
 
     def regulate_variety(self, variety: Variety) -> SystemState:
         """Determine appropriate system state based on variety measures."""
-        # calculate overall variety level
-        total_variety = (variety.dispersal + variety.intensity + variety.complexity) / 3.0
         momentum = self.environment.momentum
     
         # minimal state tracking
-        # will update environment history if needed
         # this version maintains a small history buffer while 
         # keeping the core logic simple and deterministic
-        # [!] TODO look at this and work it through; can we swap this out for a deque?
-        if hasattr(self.environment, 'history'):
-            self.environment.history.append(variety)    # store variety object
-            if len(self.environment.history) > 5:
-                self.environment.history.popleft()      # [?] using popleft() for deque; WHY?
+        # (the history is deques with maxlen=5, so recording is an append, and the oldest drops off by itself)
+        self.environment.record(variety)
 
-        # simple state transition rules based on dominant variety measure
+        # simple state transition rules based on dominant variety measure (see _REGULATION_RULES)
         # this can get more subtle later, if helpful, but at the cost of smallness
-        if total_variety > 0.8:
-            return SystemState.CONTAINING
-        elif variety.dispersal > 0.7:
-            return SystemState.DWELLING
-        elif variety.complexity > 0.7:
-            return SystemState.CONTAINING
-        elif self.environment.persistence > 3 and momentum < 0.1:
-            return SystemState.EXPANDING
-        elif variety.complexity < 0.2:
-            return SystemState.SETTLING
-        else:
-            return SystemState.EMERGING
+        persistence = self.environment.persistence
+        for test, state in _REGULATION_RULES:
+            if test(variety, momentum, persistence):
+                return state
+        return SystemState.EMERGING
+
+    # per-state replies, all taking the input so they can share one dispatch table
+    def _settling_reply(self, input_text: str) -> str:
+        return self.settling_response()
+
+    def _expanding_reply(self, input_text: str) -> str:
+        return self.apply_timing("What else is present?")
+
+    def _containing_reply(self, input_text: str) -> str:
+        pattern = self.containing_patterns[self.environment.depth_level - 1]
+        first_five = " ".join(input_text.split(None, 5)[:5])     # (no need to split past the fifth)
+        return self.apply_timing(pattern.format(first_five + "..."))
+
+    def _dwelling_reply(self, input_text: str) -> str:
+        return self.apply_timing("staying with what's present")
+
+    def _emerging_reply(self, input_text: str) -> str:
+        return self.apply_timing("What question begins to form?")
 
     def _get_state_response(self, input_text: str, state: SystemState) -> str:
         """Map system states to response patterns."""
-        response_map = {
-            SystemState.SETTLING: lambda: self.settling_response(),
-            SystemState.EXPANDING: lambda: self.apply_timing("What else is present?"),
-            SystemState.CONTAINING: lambda: self.apply_timing(
-                self.containing_patterns[self.environment.depth_level -1].format(
-                    " ".join(input_text.split()[:5]) + "..."
-                )
-            ),
-            SystemState.DWELLING: lambda: self.apply_timing("staying with what's present"),
-            SystemState.EMERGING: lambda: self.apply_timing("What question begins to form?")
-        }
-        return response_map.get(state, lambda: self.settling_response())()
+        return self._response_dispatch[_STATE_INDEX[state]](input_text)
 
 class CLISession:
     def __init__(self, homeostat: QueryHomeostat):
@@ -842,8 +1012,9 @@ class StateTransitionError(HomeostatError):
     """Invalid state transition error."""
     pass
 
-def demonstrate_usage():
-    """Simulate a sequence of interactions to showcase state progression."""
+def demonstrate_usage(simulate_delays: bool = True):
+    """Simulate a sequence of interactions to showcase state progression; without simulate_delays, it
+    runs straight through (for timing/profiling what the homeostat itself does)."""
     homeostat = QueryHomeostat()
     
     # example interaction sequence
@@ -857,7 +1028,8 @@ def demonstrate_usage():
     
     print("=== Query Homeostat Demonstration ===")
     print("System: " + homeostat.settling_response())
-    time.sleep(2)  # simulate a pause
+    if simulate_delays:
+        time.sleep(2)  # simulate a pause
 
     # process each input to see how the state evolves
     for i, user_input in enumerate(inputs):
@@ -874,7 +1046,11 @@ def demonstrate_usage():
         print(f"State: {homeostat.environment.state.name}")
         
         # small simulated delay
-        time.sleep(2.5)
+        if simulate_delays:
+            time.sleep(2.5)
+
+def main(delays: bool = typer.Option(True, "--delays/--no-delays", help="Pause between exchanges, as in a session")):
+    demonstrate_usage(simulate_delays=delays)
 
 if __name__ == "__main__":
-    demonstrate_usage()
\ No newline at end of file
+    typer.run(main)
\ No newline at end of file